@@ -19,11 +19,18 @@
 
 import argparse
 import json
+import os
 import re
 import shutil
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, List, Set, Tuple, Optional
+
+try:
+    import orjson  # opzionale: encoder C, scrive direttamente bytes UTF-8
+except ImportError:
+    orjson = None
 
 
 # ---------------- CONFIG CATEGORIE ----------------
@@ -67,6 +74,9 @@ CATEGORY_PREFIXES: Dict[str, str] = {
 
 RUN_SUBDIRS = ["META", "CORE_SYSTEM", "CONNECTIVITY", "APPS_PACKAGES", "RAW_ALL"]
 
+# copie in parallelo per run (I/O-bound: i thread rilasciano il GIL durante la copia)
+DEFAULT_COPY_WORKERS = 8
+
 
 # ---------------- DEVICE MAPPING ----------------
 # Mapping automatico da <brand>_<model>_<serial> -> device_logical
@@ -151,21 +161,88 @@ def classify_category(filename: str) -> str:
     return ""
 
 
+# cartelle già create in questo processo: evita un mkdir (syscall) per ogni file copiato
+_ensured: Set[str] = set()
+
+
+def ensure_dir(path: Path) -> None:
+    key = str(path)
+    if key in _ensured:
+        return
+    path.mkdir(parents=True, exist_ok=True)
+    # registra anche gli antenati, creati da parents=True
+    _ensured.add(key)
+    _ensured.update(str(p) for p in path.parents)
+
+
+def list_entries(folder: Path, dirs: bool) -> List[Path]:
+    """
+    Sottocartelle (dirs=True) o file di `folder`, ordinati per nome.
+    os.scandir: DirEntry.is_dir()/is_file() riusano il risultato di readdir (niente stat per voce).
+    """
+    with os.scandir(folder) as it:
+        names = [e.name for e in it if (e.is_dir() if dirs else e.is_file())]
+    return [folder / name for name in sorted(names)]
+
+
 def copy_file(src: Path, dst: Path, dry_run: bool) -> None:
     if dry_run:
         print(f"[DRY] COPY {src} -> {dst}")
         return
-    dst.parent.mkdir(parents=True, exist_ok=True)
+    ensure_dir(dst.parent)
     shutil.copy2(src, dst)
 
 
+def link_or_copy(src: Path, existing: Path, dst: Path, dry_run: bool) -> None:
+    """
+    dst ha lo stesso contenuto di `existing` (la copia in RAW_ALL appena fatta):
+    hardlink invece di una seconda copia fisica. Se il filesystem non lo supporta
+    (FAT/exFAT, volumi diversi) si ripiega sulla copia da src.
+    """
+    if dry_run:
+        print(f"[DRY] LINK {existing} -> {dst}")
+        return
+    ensure_dir(dst.parent)
+    try:
+        try:
+            dst.unlink()  # rerun: os.link non sovrascrive
+        except FileNotFoundError:
+            pass
+        os.link(existing, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def copy_run_file(job: Tuple[Path, Path, Optional[Path]], dry_run: bool) -> None:
+    src, raw_dst, cat_dst = job
+    copy_file(src, raw_dst, dry_run)
+    if cat_dst is not None:
+        link_or_copy(src, raw_dst, cat_dst, dry_run)
+
+
 def write_json(path: Path, data: dict, dry_run: bool) -> None:
     if dry_run:
         print(f"[DRY] WRITE JSON {path}")
         return
-    path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    ensure_dir(path.parent)
+    if orjson is not None:
+        payload = orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    else:
+        payload = json.dumps(data, indent=2, ensure_ascii=False).encode("utf-8")
+    # rerun sulla stessa run: meta identico -> nessuna scrittura (mtime invariato)
+    try:
+        if path.read_bytes() == payload:
+            return
+    except FileNotFoundError:
+        pass
+    # scrittura atomica: un solo buffer su file temporaneo, fsync, poi rename
+    # (un crash a metà non lascia un acquisition_meta.json troncato)
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("wb") as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
 
 
 # ---------------- ADB INTEGRAZIONE (OPZIONALE) ----------------
@@ -239,6 +316,7 @@ def process_run_folder(
     dry_run: bool,
     adb_info: bool,
     adb_path: Optional[Path],
+    copy_workers: int = DEFAULT_COPY_WORKERS,
 ) -> None:
     """
     Processa una singola cartella:
@@ -275,26 +353,33 @@ def process_run_folder(
         if dry_run:
             print(f"[DRY] MKDIR {subdir}")
         else:
-            subdir.mkdir(parents=True, exist_ok=True)
-
-    # Copy dei file
-    for item in sorted(run_dir.iterdir()):
-        if not item.is_file():
-            continue
+            ensure_dir(subdir)
 
+    # Prima passata: solo elenco delle copie (src, RAW_ALL, categoria o None) e contatori
+    copy_jobs: List[Tuple[Path, Path, Optional[Path]]] = []
+    for item in list_entries(run_dir, dirs=False):
         total_files += 1
         cat = classify_category(item.name)
         # Sempre RAW_ALL
         raw_dest = run_base / "RAW_ALL" / item.name
-        copy_file(item, raw_dest, dry_run)
         category_counts["RAW_ALL"] += 1
 
+        dst_cat = None
         if cat:
             dst_cat = run_base / cat / item.name
-            copy_file(item, dst_cat, dry_run)
             category_counts[cat] += 1
         else:
             uncategorized_files.append(item.name)
+        copy_jobs.append((item, raw_dest, dst_cat))
+
+    # Seconda passata: copie (in dry_run sequenziali, così il log resta ordinato)
+    if dry_run or copy_workers <= 1:
+        for job in copy_jobs:
+            copy_run_file(job, dry_run)
+    else:
+        with ThreadPoolExecutor(max_workers=copy_workers) as ex:
+            # list() per propagare la prima eccezione di copia, come nel loop sequenziale
+            list(ex.map(lambda job: copy_run_file(job, False), copy_jobs))
 
     # Meta base
     meta = {
@@ -362,6 +447,12 @@ def main():
         action="store_true",
         help="Se true, prova a leggere getprop tramite platform-tools\\adb.exe e mette i dati nel meta.",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_COPY_WORKERS,
+        help=f"Thread di copia per run (default: {DEFAULT_COPY_WORKERS}; 1 = sequenziale).",
+    )
     args = parser.parse_args()
 
     android_root = Path(args.android_logs_root).resolve()
@@ -386,10 +477,11 @@ def main():
     print(f"[INFO] script_name/ver   : {args.script_name} {args.script_version}")
     print(f"[INFO] dry_run           : {args.dry_run}")
     print(f"[INFO] adb_info          : {args.adb_info}")
+    print(f"[INFO] workers           : {args.workers}")
     print("")
 
     # Trova tutte le sottocartelle "run"
-    run_dirs = [p for p in sorted(android_root.iterdir()) if p.is_dir()]
+    run_dirs = list_entries(android_root, dirs=True)
 
     if not run_dirs:
         print("[WARN] Nessuna sottocartella trovata in android_logs_root.")
@@ -405,6 +497,7 @@ def main():
             dry_run=args.dry_run,
             adb_info=args.adb_info,
             adb_path=adb_path,
+            copy_workers=args.workers,
         )
 
     print("\n[DONE] Riorganizzazione completata (o simulata se dry-run).")
@@ -176,6 +176,19 @@ CREATE INDEX IF NOT EXISTS idx_pc_device_ts
 CREATE INDEX IF NOT EXISTS idx_pc_account_ts
     ON EVENTI_PC (account_id, timestamp_utc);
 
+CREATE INDEX IF NOT EXISTS idx_pc_device_src_code_ts
+    ON EVENTI_PC (device_id, source_log, event_code, timestamp_utc);
+
+-- Stato di ingest dei CSV (m02_windows_logs_03): file invariati non vengono riletti
+CREATE TABLE IF NOT EXISTS FILE_INGEST_STATE (
+    path          TEXT    NOT NULL,
+    load_key      TEXT    NOT NULL,     -- source_log|event_code|limit_per_run
+    mtime         REAL    NOT NULL,
+    size          INTEGER NOT NULL,
+    rows_inserted INTEGER NOT NULL,
+    PRIMARY KEY (path, load_key)
+);
+
 
 -- 3.3 EVENTI_RETE (pcap, sniff, WAN monitor, router)
 CREATE TABLE IF NOT EXISTS EVENTI_RETE (
@@ -42,8 +42,12 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import Dict, Optional, Tuple
 
+# regex compilate una volta: usate per ogni record validato
+RUN_ID_RE = re.compile(r"^(20\d{2})(\d{2})(\d{2})_(\d{2})(\d{2})(\d{2})$")
+TS_DATE_RE = re.compile(r"^(20\d{2}-\d{2}-\d{2})\s+\d{2}:\d{2}:\d{2}")
 
-@dataclass
+
+@dataclass(slots=True)  # uno per record letto: niente __dict__ per istanza
 class AndroidEventRecord:
     android_event_id: int
     timestamp_utc: str
@@ -77,17 +81,26 @@ def parse_run_id_from_path(path: Path) -> Optional[str]:
         return None
 
 
-def parse_device_logical_from_path(dataset_root: Path, path: Path) -> Optional[str]:
+def relative_to_root(dataset_root: Path, path: Path) -> Optional[Path]:
     """
-    Path atteso dentro dataset_root:
-      dataset_root / <device_logical> / <script_tag> / <run_id> / ...
-
-    Ritorna <device_logical> oppure None se non riconosciuto.
+    Path relativo a dataset_root (già risolta), oppure None se path non sta sotto.
+    Un solo resolve() per record, riusato dai controlli 2 e 3.
     """
     try:
-        rel = path.resolve().relative_to(dataset_root.resolve())
+        return path.resolve().relative_to(dataset_root)
     except ValueError:
         return None
+
+
+def parse_device_logical_from_path(rel: Optional[Path]) -> Optional[str]:
+    """
+    rel = path relativo a dataset_root (vedi relative_to_root):
+      <device_logical> / <script_tag> / <run_id> / ...
+
+    Ritorna <device_logical> oppure None se non riconosciuto.
+    """
+    if rel is None:
+        return None
     parts = rel.parts
     if len(parts) < 2:
         return None
@@ -99,7 +112,7 @@ def parse_run_id(run_id: str) -> Optional[Tuple[str, str, str, str, str, str]]:
     run_id: 'YYYYMMDD_HHMMSS'
     ritorna (YYYY, MM, DD, hh, mm, ss) oppure None se invalido.
     """
-    m = re.match(r"^(20\d{2})(\d{2})(\d{2})_(\d{2})(\d{2})(\d{2})$", run_id)
+    m = RUN_ID_RE.match(run_id)
     if not m:
         return None
     return m.group(1), m.group(2), m.group(3), m.group(4), m.group(5), m.group(6)
@@ -110,7 +123,7 @@ def date_from_timestamp_utc(ts: str) -> Optional[str]:
     timestamp_utc atteso tipo 'YYYY-MM-DD HH:MM:SS'
     ritorna 'YYYY-MM-DD' oppure None.
     """
-    m = re.match(r"^(20\d{2}-\d{2}-\d{2})\s+\d{2}:\d{2}:\d{2}", ts)
+    m = TS_DATE_RE.match(ts)
     if not m:
         return None
     return m.group(1)
@@ -188,6 +201,11 @@ def main():
 
     conn = sqlite3.connect(args.db)
     conn.row_factory = sqlite3.Row
+    # workload di sola lettura: DB mappato in memoria, cache ampia, temporanei in RAM
+    conn.executescript(
+        "PRAGMA query_only=ON; PRAGMA mmap_size=268435456; "
+        "PRAGMA cache_size=-100000; PRAGMA temp_store=MEMORY;"
+    )
 
     device_labels = load_device_labels(conn)
 
@@ -262,15 +280,15 @@ def main():
                 print("  [OK ] file esiste")
 
                 # 2. path sotto dataset_root?
-                try:
-                    _ = file_path.resolve().relative_to(dataset_root.resolve())
+                rel = relative_to_root(dataset_root, file_path)
+                if rel is not None:
                     print("  [OK ] file sotto dataset_root")
-                except ValueError:
+                else:
                     print(f"  [ERR] file NON sotto dataset_root ({dataset_root})")
                     record_ok = False
 
                 # 3. device_logical dal path vs DEVICE_MASTER.device_label
-                device_logical = parse_device_logical_from_path(dataset_root, file_path)
+                device_logical = parse_device_logical_from_path(rel)
                 expected_label = device_labels.get(rec.device_id)
 
                 if device_logical is None:
@@ -317,8 +335,8 @@ def main():
                             else:
                                 print("  [OK ] data da run_id combacia con data da timestamp_utc")
 
-                # 5. title trovato nel file?
-                if not args.skip_title_check and file_path.exists():
+                # 5. title trovato nel file? (esistenza già verificata al punto 1)
+                if not args.skip_title_check:
                     if rec.title and title_in_file(rec.title, file_path):
                         print("  [OK ] title trovato nel file sorgente")
                     else:
@@ -64,7 +64,7 @@ import subprocess
 import sys
 from collections import Counter
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
 
 
 def parse_date(value: Optional[str]) -> Optional[dt.datetime]:
@@ -171,7 +171,11 @@ def parse_event_time(ts: str) -> Optional[dt.datetime]:
     if not ts:
         return None
 
-    ts_clean = ts.strip().strip('"').replace("\xa0", " ")
+    ts_clean = ts.strip()
+    if ts_clean.startswith('"') or ts_clean.endswith('"'):
+        ts_clean = ts_clean.strip('"')
+    if "\xa0" in ts_clean:
+        ts_clean = ts_clean.replace("\xa0", " ")
 
     # 1) Try ISO / quasi-ISO
     v = ts_clean
@@ -211,23 +215,70 @@ def parse_event_time(ts: str) -> Optional[dt.datetime]:
     return dt_obj
 
 
+class ColumnIndex(NamedTuple):
+    """Header of an events CSV plus the resolved index of each column we use
+    (None when the column is missing). Built once per file so rows can stay
+    plain tuples instead of one dict per event."""
+
+    header: Tuple[str, ...]
+    time: Optional[int]
+    event_id: Optional[int]
+    provider: Optional[int]
+    level: Optional[int]
+
+    @classmethod
+    def from_header(cls, header: Sequence[str]) -> "ColumnIndex":
+        def first(*names: str) -> Optional[int]:
+            for name in names:
+                if name in header:
+                    return header.index(name)
+            return None
+
+        return cls(
+            header=tuple(header),
+            time=first("TimeCreated", "timeCreated", "Date"),
+            event_id=first("Id", "EventID", "EventId"),
+            provider=first("ProviderName", "Source"),
+            level=first("LevelDisplayName", "Level"),
+        )
+
+
+EventRow = Tuple[str, ...]
+
+
+def _field(row: EventRow, idx: Optional[int]) -> str:
+    """Value of column idx in row, or "" if the column is missing/short row."""
+    if idx is None or idx >= len(row):
+        return ""
+    return row[idx]
+
+
 def read_csv_events(
     csv_path: Path, start: Optional[dt.datetime], end: Optional[dt.datetime]
-) -> List[Dict[str, str]]:
+) -> Tuple[ColumnIndex, List[EventRow]]:
     """
     Read a CSV of events exported from Get-WinEvent and apply (if possible)
     the date filter. Supports local timestamps like 19/11/2025 21:17:29.
 
+    Returns the ColumnIndex built from the header and the kept rows as
+    tuples (one tuple per event, no per-row dict).
+
     If the timestamp cannot be parsed, the event is STILL KEPT (without
     additional Python-side date filtering) so we don't lose information.
     """
-    events: List[Dict[str, str]] = []
+    events: List[EventRow] = []
     parse_warning_shown = False
 
-    with csv_path.open("r", encoding="utf-8", errors="ignore") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            ts = row.get("TimeCreated") or row.get("timeCreated") or row.get("Date")
+    with csv_path.open("r", encoding="utf-8", errors="ignore", newline="") as f:
+        reader = csv.reader(f)
+        columns = ColumnIndex.from_header(next(reader, ()))
+        ts_idx = columns.time
+        for fields in reader:
+            # csv.reader yields [] for blank lines (DictReader skipped them)
+            if not fields:
+                continue
+            row = tuple(fields)
+            ts = _field(row, ts_idx)
 
             # No timestamp column → keep the event anyway
             if not ts:
@@ -255,11 +306,11 @@ def read_csv_events(
 
             events.append(row)
 
-    return events
+    return columns, events
 
 
-def summarise_events(events: List[Dict[str, str]]) -> Dict[str, Dict[str, int]]:
-    """Given a list of event rows, return dictionaries summarising
+def summarise_events(columns: ColumnIndex, events: List[EventRow]) -> Dict[str, Dict[str, int]]:
+    """Given the event rows of one log, return dictionaries summarising
     counts by event ID, provider name and level. The result is a dict
     with keys 'id', 'provider', 'level' mapping to Counter objects.
     """
@@ -267,32 +318,30 @@ def summarise_events(events: List[Dict[str, str]]) -> Dict[str, Dict[str, int]]:
     by_provider = Counter()
     by_level = Counter()
     for row in events:
-        event_id = row.get("Id") or row.get("EventID") or row.get("EventId")
-        provider = row.get("ProviderName") or row.get("Source")
-        level = row.get("LevelDisplayName") or row.get("Level")
+        event_id = _field(row, columns.event_id)
+        provider = _field(row, columns.provider)
+        level = _field(row, columns.level)
         if event_id:
-            by_id[str(event_id)] += 1
+            by_id[event_id] += 1
         if provider:
-            by_provider[str(provider)] += 1
+            by_provider[provider] += 1
         if level:
-            by_level[str(level)] += 1
+            by_level[level] += 1
     return {"id": by_id, "provider": by_provider, "level": by_level}
 
 
-def write_events_csv(events: List[Dict[str, str]], out_path: Path) -> None:
-    """Write the list of event rows to a CSV file."""
+def write_events_csv(columns: ColumnIndex, events: List[EventRow], out_path: Path) -> None:
+    """Write the event rows (with their original header) to a CSV file."""
     if not events:
         with out_path.open("w", encoding="utf-8", newline="") as f:
             writer = csv.writer(f)
             writer.writerow(["No events in specified date range or log is empty"])
         return
 
-    fieldnames = list(events[0].keys())
     with out_path.open("w", encoding="utf-8", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        for row in events:
-            writer.writerow(row)
+        writer = csv.writer(f)
+        writer.writerow(columns.header)
+        writer.writerows(events)
 
 
 def write_summary_csv(summary: Dict[str, Dict[str, int]], out_path: Path) -> None:
@@ -407,23 +456,28 @@ def write_markdown_summary(
 
 def analyse_log(
     log_path: Path, start: Optional[dt.datetime], end: Optional[dt.datetime], tmp_dir: Path
-) -> Tuple[List[Dict[str, str]], Dict[str, Dict[str, int]]]:
+) -> Tuple[ColumnIndex, List[EventRow], Dict[str, Dict[str, int]]]:
     """Given a path to either a .csv or .evtx log, extract events within
-    the specified date range and return both the list of events and a
-    summary Counter dict.
+    the specified date range and return the column index, the list of
+    events and a summary Counter dict.
     """
+    empty = (
+        ColumnIndex.from_header(()),
+        [],
+        {"id": Counter(), "provider": Counter(), "level": Counter()},
+    )
     if log_path.suffix.lower() == ".csv":
         csv_path = log_path
     elif log_path.suffix.lower() == ".evtx":
         csv_path = extract_evtx_to_csv(log_path, tmp_dir)
         if csv_path is None:
-            return [], {"id": Counter(), "provider": Counter(), "level": Counter()}
+            return empty
     else:
-        return [], {"id": Counter(), "provider": Counter(), "level": Counter()}
+        return empty
 
-    events = read_csv_events(csv_path, start, end)
-    summary = summarise_events(events)
-    return events, summary
+    columns, events = read_csv_events(csv_path, start, end)
+    summary = summarise_events(columns, events)
+    return columns, events, summary
 
 
 def main() -> None:
@@ -480,10 +534,10 @@ def main() -> None:
 
         log_name = entry.stem
         print(f"Processing {entry.name}…")
-        events, summary = analyse_log(entry, start, end, tmp_dir)
+        columns, events, summary = analyse_log(entry, start, end, tmp_dir)
 
         events_csv_path = report_dir / f"{log_name}_events.csv"
-        write_events_csv(events, events_csv_path)
+        write_events_csv(columns, events, events_csv_path)
 
         summary_csv_path = report_dir / f"{log_name}_summary.csv"
         write_summary_csv(summary, summary_csv_path)
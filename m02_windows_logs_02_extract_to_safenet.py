@@ -70,7 +70,12 @@ import sqlite3
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Set, Tuple
+
+try:
+    import ahocorasick  # pyahocorasick, opzionale
+except ImportError:
+    ahocorasick = None
 
 
 # Tipi di log riconosciuti, mappati per prefisso nel nome file (case insensitive)
@@ -84,6 +89,25 @@ LOG_TYPE_PATTERNS: Dict[str, str] = {
 }
 
 
+def build_log_type_automaton():
+    """
+    Costruisce un automa Aho-Corasick su LOG_TYPE_PATTERNS (un solo passaggio
+    sul nome file per tutti i pattern). Ogni pattern porta con sé la sua
+    posizione nel dict, così si conserva la stessa preferenza del loop lineare.
+    Ritorna None se pyahocorasick non è installato.
+    """
+    if ahocorasick is None:
+        return None
+    automaton = ahocorasick.Automaton()
+    for priority, (pattern, log_type) in enumerate(LOG_TYPE_PATTERNS.items()):
+        automaton.add_word(pattern, (priority, log_type))
+    automaton.make_automaton()
+    return automaton
+
+
+LOG_TYPE_AUTOMATON = build_log_type_automaton()
+
+
 RUN_SUBDIRS = [
     "META",
     "LOGS",
@@ -133,12 +157,19 @@ def parse_run_id(run_id: str) -> Optional[datetime]:
         return None
 
 
-def load_device_map(conn: sqlite3.Connection) -> Dict[str, int]:
+def load_device_map(conn: sqlite3.Connection, labels: Set[str]) -> Dict[str, int]:
     """
-    Crea una mappa device_label -> device_id partendo da DEVICE_MASTER.
+    Crea una mappa device_label -> device_id partendo da DEVICE_MASTER,
+    limitata ai soli device_label effettivamente trovati nelle run sorgente.
     """
+    if not labels:
+        return {}
+    placeholders = ",".join("?" * len(labels))
     cur = conn.cursor()
-    cur.execute("SELECT device_id, device_label FROM DEVICE_MASTER")
+    cur.execute(
+        f"SELECT device_id, device_label FROM DEVICE_MASTER WHERE device_label IN ({placeholders})",
+        list(labels),
+    )
     mapping: Dict[str, int] = {}
     for device_id, label in cur.fetchall():
         if label:
@@ -167,6 +198,10 @@ def classify_log_type(filename: str) -> Optional[str]:
     Usa preferenze su LOG_TYPE_PATTERNS.
     """
     name = filename.lower()
+    if LOG_TYPE_AUTOMATON is not None:
+        matches = [value for _, value in LOG_TYPE_AUTOMATON.iter(name)]
+        return min(matches)[1] if matches else None
+
     for pattern, log_type in LOG_TYPE_PATTERNS.items():
         if pattern in name:
             return log_type
@@ -415,12 +450,6 @@ def main() -> None:
     conn = sqlite3.connect(args.db)
     conn.row_factory = sqlite3.Row
 
-    device_map = load_device_map(conn)
-    if not device_map:
-        print("[WARN] Nessun device in DEVICE_MASTER. Controlla di aver inserito SPARTACUS, VAGABONDO, PICCIRILLA_AleNew, ecc.")
-    else:
-        print(f"[INFO] Device map: {device_map}")
-
     # Trova tutte le run partendo dai nomi cartella (device_logical_runId)
     runs = iter_runs(windows_logs_root)
     if not runs:
@@ -430,6 +459,14 @@ def main() -> None:
 
     print(f"[INFO] Trovate {len(runs)} run in {windows_logs_root}")
 
+    # Mappa device caricata solo per i device_logical presenti nelle run
+    labels = {r.device_logical for r in runs}
+    device_map = load_device_map(conn, labels)
+    if not device_map:
+        print("[WARN] Nessun device in DEVICE_MASTER. Controlla di aver inserito SPARTACUS, VAGABONDO, PICCIRILLA_AleNew, ecc.")
+    else:
+        print(f"[INFO] Device map: {device_map}")
+
     for r in runs:
         print(f"\n[RUN] {r.source_run_dir}")
         print(f"      device_logical = {r.device_logical}")
@@ -27,10 +27,16 @@
 #
 
 import argparse
+import codecs
 import csv
+import itertools
+import mmap
+import os
 import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from operator import attrgetter
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional, Tuple
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
 # ---------------------------------------------------------------------------
 # Import dalle utility del modulo M02_01 (il tuo log dumper Windows)
@@ -50,6 +56,24 @@ except Exception as e:
 # Helper DB
 # ---------------------------------------------------------------------------
 
+INSERT_EVENTI_PC = """
+    INSERT INTO EVENTI_PC (
+        timestamp_utc,
+        device_id,
+        source_log,
+        event_code,
+        account_id,
+        ip_remoto,
+        logon_type,
+        process_name,
+        command_line,
+        description,
+        sospetto_flag,
+        motivazione_sospetto
+    ) VALUES (?, ?, ?, ?, NULL, NULL, NULL, NULL, NULL, ?, 0, NULL)
+"""
+
+
 def load_device_map(conn: sqlite3.Connection) -> Dict[str, int]:
     """
     device_label -> device_id da DEVICE_MASTER.
@@ -63,6 +87,93 @@ def load_device_map(conn: sqlite3.Connection) -> Dict[str, int]:
     return mapping
 
 
+def open_db(db_path: str, dry_run: bool = False) -> sqlite3.Connection:
+    """
+    Apre il DB SQLite in autocommit (transazioni gestite a mano con BEGIN/COMMIT)
+    con PRAGMA orientati al caricamento: temp in RAM, mmap 256 MB e cache 128 MB.
+    WAL e synchronous=NORMAL solo se si scrive: journal_mode=WAL resta salvato nel
+    file del DB, e il dry-run non deve modificarlo.
+    """
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    if not dry_run:
+        conn.executescript(
+            "PRAGMA journal_mode=WAL;"
+            "PRAGMA synchronous=NORMAL;"
+        )
+    conn.executescript(
+        "PRAGMA temp_store=MEMORY;"
+        "PRAGMA mmap_size=268435456;"
+        "PRAGMA cache_size=-131072;"
+    )
+    return conn
+
+
+# Stato di ingest per file: (mtime, size) all'ultimo load riuscito, per chiave di
+# load (source_log / event_code / limite), così un CSV invariato non viene riletto.
+INGEST_STATE_DDL = """
+    CREATE TABLE IF NOT EXISTS FILE_INGEST_STATE (
+        path          TEXT    NOT NULL,
+        load_key      TEXT    NOT NULL,
+        mtime         REAL    NOT NULL,
+        size          INTEGER NOT NULL,
+        rows_inserted INTEGER NOT NULL,
+        PRIMARY KEY (path, load_key)
+    )
+"""
+
+UPSERT_INGEST_STATE = """
+    INSERT OR REPLACE INTO FILE_INGEST_STATE (path, load_key, mtime, size, rows_inserted)
+    VALUES (?, ?, ?, ?, ?)
+"""
+
+
+def load_ingest_state(conn: sqlite3.Connection, load_key: str) -> Dict[str, Tuple[float, int]]:
+    """
+    path -> (mtime, size) dei file già caricati con questa load_key.
+    Se la tabella non esiste ancora (es. dry-run su DB vecchio) ritorna {}.
+    """
+    try:
+        rows = conn.execute(
+            "SELECT path, mtime, size FROM FILE_INGEST_STATE WHERE load_key = ?",
+            (load_key,),
+        ).fetchall()
+    except sqlite3.OperationalError:
+        return {}
+    return {path: (mtime, size) for path, mtime, size in rows}
+
+
+def begin_bulk_load(conn: sqlite3.Connection) -> None:
+    """
+    Prepara il DB al caricamento massivo: FK disattivate, cache_spill OFF
+    (le pagine sporche restano in cache fino al COMMIT), locking_mode
+    EXCLUSIVE (siamo l'unico writer: il lock sul file resta nostro fino alla
+    chiusura della connessione) e un'unica transazione IMMEDIATE (lock di
+    scrittura preso subito) per tutti i file.
+    """
+    conn.execute("PRAGMA foreign_keys=OFF")
+    conn.execute("PRAGMA locking_mode=EXCLUSIVE")
+    conn.execute("PRAGMA cache_spill=OFF")
+    conn.execute("BEGIN IMMEDIATE")
+
+
+def end_bulk_load(conn: sqlite3.Connection) -> None:
+    """
+    Chiude il caricamento massivo: COMMIT, FK riattivate e indice composito
+    (device_id, source_log, event_code, timestamp_utc) creato se mancante,
+    così le query a valle per device/log/EventID restano indicizzate.
+    """
+    conn.commit()
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.execute("PRAGMA cache_spill=ON")
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_pc_device_src_code_ts
+            ON EVENTI_PC (device_id, source_log, event_code, timestamp_utc)
+        """
+    )
+    conn.commit()
+
+
 # ---------------------------------------------------------------------------
 # Iterazione sulle cartelle SAFENET
 # ---------------------------------------------------------------------------
@@ -87,25 +198,30 @@ def iter_main_log_csv_files(
     """
     src_norm = source_log.strip()
 
-    for dev_dir in sorted(dataset_root.iterdir()):
-        if not dev_dir.is_dir():
-            continue
-
-        device_label = dev_dir.name
-        if device_label_filter and device_label != device_label_filter:
-            continue
+    def subdirs(path: str) -> List[os.DirEntry]:
+        # scandir: is_dir() usa il tipo già letto da readdir, niente stat extra
+        # (stat solo per i symlink, che vengono seguiti come faceva Path.is_dir)
+        with os.scandir(path) as it:
+            return sorted(
+                (e for e in it if e.is_dir()),
+                key=attrgetter("name"),
+            )
+
+    if device_label_filter:
+        # filtro device: nessuna scansione della root, si va diretti alla cartella
+        dev_path = os.path.join(dataset_root, device_label_filter)
+        dev_dirs = [(device_label_filter, dev_path)] if os.path.isdir(dev_path) else []
+    else:
+        dev_dirs = [(e.name, e.path) for e in subdirs(os.fspath(dataset_root))]
 
-        for tool_dir in sorted(dev_dir.iterdir()):
-            if not tool_dir.is_dir():
-                continue
+    for device_label, dev_path in dev_dirs:
+        for tool_dir in subdirs(dev_path):
             tool_tag = tool_dir.name
 
-            for run_dir in sorted(tool_dir.iterdir()):
-                if not run_dir.is_dir():
-                    continue
+            for run_dir in subdirs(tool_dir.path):
                 run_id = run_dir.name
 
-                logs_root = run_dir / "LOGS" / src_norm
+                logs_root = Path(run_dir.path, "LOGS", src_norm)
                 if not logs_root.is_dir():
                     continue
 
@@ -124,76 +240,291 @@ def iter_main_log_csv_files(
 # Lettura CSV (fix BOM) + estrazione campi
 # ---------------------------------------------------------------------------
 
-def event_rows_from_file(csv_path: Path) -> List[dict]:
+# Oltre questa soglia il CSV viene letto via mmap (pagine caricate dal kernel
+# su richiesta, niente copia nel buffer di I/O di Python)
+MMAP_THRESHOLD = 64 * 1024 * 1024
+
+
+def iter_mmap_lines(csv_path: Path) -> Iterator[str]:
+    """
+    Righe (str) di un CSV UTF-8 lette da una mappa in memoria del file.
+    Il BOM iniziale viene rimosso come farebbe 'utf-8-sig'; il taglio a '\n'
+    non spezza mai un carattere multibyte UTF-8.
+    """
+    with csv_path.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        first = mm.readline()
+        if first.startswith(codecs.BOM_UTF8):
+            first = first[len(codecs.BOM_UTF8):]
+        yield first.decode("utf-8", errors="replace")
+        for line in iter(mm.readline, b""):
+            yield line.decode("utf-8", errors="replace")
+
+
+def iter_event_rows(csv_path: Path) -> Iterator[List[str]]:
     """
-    Legge un CSV di eventi (UTF-8 con BOM) e restituisce una lista di dict.
+    Legge un CSV di eventi (UTF-8 con BOM) riga per riga (generator) con
+    csv.reader: la prima riga prodotta è l'header, poi le righe come liste di
+    stringhe (niente dict per riga). Il file non viene mai materializzato in
+    memoria, e chi consuma può interrompere la lettura appena raggiunto il limite.
     Non fa filtri temporali qui; li gestiamo eventualmente a livello DB in seguito.
     """
     if csv_path.suffix.lower() != ".csv":
         print(f"  [INFO] Salto file non-CSV in questo probe: {csv_path}")
-        return []
+        return
+
+    if csv_path.stat().st_size > MMAP_THRESHOLD:
+        lines = iter_mmap_lines(csv_path)
+        try:
+            yield from csv.reader(lines)
+        finally:
+            lines.close()
+        return
 
-    events: List[dict] = []
     # 'utf-8-sig' mangia il BOM iniziale → header "TimeCreated" diventa corretto
-    with csv_path.open("r", encoding="utf-8-sig", errors="replace") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            events.append(row)
-    return events
+    with csv_path.open("r", encoding="utf-8-sig", errors="replace", newline="") as f:
+        yield from csv.reader(f)
+
+
+# Varianti di header per le colonne usate (in ordine di preferenza)
+TIME_COLUMNS = ("TimeCreated", "timeCreated", "TimeCreatedUtc", "Date")
+EVENT_ID_COLUMNS = ("Id", "EventID", "Event Id", "EventId")
+MESSAGE_COLUMNS = ("Message", "Description")
+
+
+def find_column(fieldnames: List[str], candidates: Tuple[str, ...]) -> Optional[int]:
+    """
+    Restituisce l'indice del primo header di 'candidates' presente in 'fieldnames',
+    o None se nessuno è presente.
+    """
+    for name in candidates:
+        if name in fieldnames:
+            return fieldnames.index(name)
+    return None
+
+
+def normalise_timestamp(ts_value: str) -> Optional[str]:
+    """
+    Timestamp → "YYYY-MM-DD HH:MM:SS" UTC se parse_event_time lo riconosce,
+    altrimenti la stringa grezza (locale); None se vuoto.
+    """
+    if not ts_value:
+        return None
+    dt_obj = parse_event_time(ts_value)
+    if dt_obj is not None:
+        return dt_obj.strftime("%Y-%m-%d %H:%M:%S")
+    # Parse fallito → usiamo la stringa grezza (locale)
+    return ts_value
 
 
-def extract_basic_fields(row: dict) -> Tuple[Optional[str], Optional[int], str]:
+def parse_event_code(ev_raw: str) -> Optional[int]:
     """
-    Estrae:
+    EventID grezzo (già strip) → int; None se vuoto o non intero (es. "1.5").
+    Fast path senza try/except: niente eccezione (e traceback) sui valori non
+    numerici. Usato da entrambi gli engine, così i codici coincidono.
+    """
+    if ev_raw.isdecimal():
+        return int(ev_raw)
+    if ev_raw[:1] == "-" and ev_raw[1:].isdecimal():
+        return int(ev_raw)
+    return None
+
+
+def make_extractor(
+    fieldnames: List[str],
+) -> Callable[[List[str]], Tuple[Optional[str], Optional[int], str]]:
+    """
+    Risolve UNA volta per file gli indici di timestamp / EventID / Message
+    dall'header e restituisce una funzione che, data una riga (lista), estrae:
       - timestamp_utc_str (o stringa grezza se il parse fallisce)
       - event_code (int, se possibile)
       - description (Message/Description)
     """
-    # Timestamp: varianti possibili
-    ts_value = (
-        row.get("TimeCreated")
-        or row.get("timeCreated")
-        or row.get("TimeCreatedUtc")
-        or row.get("Date")
-        or ""
-    )
-    ts_value = str(ts_value).strip()
+    ts_idx = find_column(fieldnames, TIME_COLUMNS)
+    id_idx = find_column(fieldnames, EVENT_ID_COLUMNS)
+    msg_idx = find_column(fieldnames, MESSAGE_COLUMNS)
 
-    ts_utc_str: Optional[str]
-    if ts_value:
-        dt_obj = parse_event_time(ts_value)
-        if dt_obj is not None:
-            ts_utc_str = dt_obj.strftime("%Y-%m-%d %H:%M:%S")
-        else:
-            # Parse fallito → usiamo la stringa grezza (locale)
-            ts_utc_str = ts_value
-    else:
-        ts_utc_str = None
-
-    # EventID
-    ev_raw = (
-        row.get("Id")
-        or row.get("EventID")
-        or row.get("Event Id")
-        or row.get("EventId")
-        or ""
+    def extract_basic_fields(row: List[str]) -> Tuple[Optional[str], Optional[int], str]:
+        n = len(row)
+
+        # Timestamp
+        ts_value = row[ts_idx].strip() if ts_idx is not None and ts_idx < n else ""
+        ts_utc_str = normalise_timestamp(ts_value)
+
+        # EventID
+        ev_raw = row[id_idx].strip() if id_idx is not None and id_idx < n else ""
+        event_code = parse_event_code(ev_raw)
+
+        # Descrizione
+        desc = row[msg_idx] if msg_idx is not None and msg_idx < n else ""
+
+        return ts_utc_str, event_code, desc
+
+    return extract_basic_fields
+
+
+# ---------------------------------------------------------------------------
+# Parsing di un file → parametri per INSERT_EVENTI_PC
+# ---------------------------------------------------------------------------
+
+EventParams = Tuple[str, int, str, Optional[int], str]
+
+
+def parse_file_csv(
+    csv_file: Path,
+    device_id: int,
+    source_log: str,
+    event_code: Optional[int],
+    limit: int,
+) -> Tuple[int, List[EventParams]]:
+    """
+    Engine "csv": legge il file in streaming con csv.reader.
+    Ritorna (righe viste, lista di tuple per INSERT_EVENTI_PC), fermandosi
+    appena raggiunto 'limit'.
+    """
+    rows = iter_event_rows(csv_file)
+    # csv.reader produce [] per le righe vuote: saltate come fa pandas (e DictReader)
+    header = next((row for row in rows if row), None)
+    if header is None:
+        return 0, []
+
+    extract_basic_fields = make_extractor(header)
+
+    # Pipeline di iteratori (niente loop Python esplicito): contatore righe
+    # viste → filtro EventID sul valore grezzo, PRIMA di qualsiasi parse →
+    # estrazione campi → scarto timestamp vuoti → islice al limite, che smette
+    # di leggere il file appena raggiunto.
+    rows_seen = itertools.count()
+    candidates: Iterable[List[str]] = (
+        row for row, _ in zip((row for row in rows if row), rows_seen)
     )
+
+    if event_code is not None:
+        id_idx = find_column(header, EVENT_ID_COLUMNS)
+        event_code_str = str(event_code)
+        candidates = (
+            row for row in candidates
+            if id_idx is not None and id_idx < len(row) and row[id_idx].strip() == event_code_str
+        )
+
+    # islice a limite+1: come il loop originale le righe viste arrivano fino alla
+    # prima accettata oltre il limite (quella che faceva scattare il break), che
+    # poi viene scartata
+    limit = max(limit, 0)
+    params = list(itertools.islice(
+        (
+            (ts_utc_str, device_id, source_log, code, desc)
+            for ts_utc_str, code, desc in map(extract_basic_fields, candidates)
+            if ts_utc_str is not None
+        ),
+        limit + 1,
+    ))
+    del params[limit:]
+
+    rows.close()
+    return next(rows_seen), params
+
+
+def parse_file_pandas(
+    csv_file: Path,
+    device_id: int,
+    source_log: str,
+    event_code: Optional[int],
+    limit: int,
+    chunksize: int = 100_000,
+) -> Tuple[int, List[EventParams]]:
+    """
+    Engine "pandas": legge solo le colonne utili a blocchi di 'chunksize' righe
+    e applica filtro EventID, timestamp vuoti e limite in forma vettoriale.
+    Stesso output di parse_file_csv.
+    """
     try:
-        event_code = int(str(ev_raw).strip())
-    except Exception:
-        event_code = None
-
-    # Descrizione
-    desc = (
-        row.get("Message")
-        or row.get("Description")
-        or ""
-    )
-    if desc is None:
-        desc = ""
-    desc = str(desc)
+        import pandas as pd
+    except ImportError:
+        raise SystemExit("--engine pandas richiede pandas (pip install pandas).")
+
+    seen = 0
+    params: List[EventParams] = []
+
+    if csv_file.suffix.lower() != ".csv":
+        print(f"  [INFO] Salto file non-CSV in questo probe: {csv_file}")
+        return seen, params
+
+    read_opts = dict(encoding="utf-8-sig", encoding_errors="replace", dtype=str, keep_default_na=False)
+    try:
+        header = list(pd.read_csv(csv_file, nrows=0, **read_opts).columns)
+    except pd.errors.EmptyDataError:
+        return seen, params
+
+    def column_name(candidates: Tuple[str, ...]) -> Optional[str]:
+        idx = find_column(header, candidates)
+        return header[idx] if idx is not None else None
+
+    ts_col = column_name(TIME_COLUMNS)
+    id_col = column_name(EVENT_ID_COLUMNS)
+    msg_col = column_name(MESSAGE_COLUMNS)
+    usecols = [c for c in (ts_col, id_col, msg_col) if c is not None]
+
+    if ts_col is None or (event_code is not None and id_col is None):
+        # nessun timestamp (o nessuna colonna EventID da filtrare) → niente da inserire
+        return seen, params
+
+    limit = max(limit, 0)
+    accepted = 0
+    for chunk in pd.read_csv(csv_file, usecols=usecols, chunksize=chunksize, **read_opts):
+        # come l'engine csv: si conta fino alla prima riga accettata oltre il limite
+        remaining = limit + 1 - accepted
+        if remaining <= 0:
+            break
+
+        mask = chunk[ts_col].str.strip() != ""
+        if event_code is not None:
+            mask &= chunk[id_col].str.strip() == str(event_code)
+        hits = mask.to_numpy().nonzero()[0]
+        if len(hits) >= remaining:
+            # limite raggiunto in questo chunk: come l'engine csv contiamo solo le
+            # righe esaminate fino a quella che chiude la lettura, non l'intero chunk
+            hits = hits[:remaining]
+            seen += int(hits[-1]) + 1
+        else:
+            seen += len(chunk)
+        accepted += len(hits)
+        hits = hits[:limit - len(params)]
+        if len(hits) == 0:
+            continue
+        chunk = chunk.iloc[hits]
+
+        ts_utc = chunk[ts_col].str.strip().map(normalise_timestamp)
+        # stessa conversione dell'engine csv: "1.5" o testo → None, mai un cast float→int
+        if id_col is not None:
+            # lista Python, non Series.map: None resterebbe NaN in una Series float
+            codes = [parse_event_code(v) for v in chunk[id_col].str.strip()]
+        else:
+            codes = [None] * len(chunk)
+        descs = chunk[msg_col] if msg_col is not None else pd.Series("", index=chunk.index)
+
+        params.extend(
+            (ts, device_id, source_log, code, desc)
+            for ts, code, desc in zip(ts_utc, codes, descs)
+        )
+
+    return seen, params
+
+
+PARSERS = {
+    "csv": parse_file_csv,
+    "pandas": parse_file_pandas,
+}
 
-    return ts_utc_str, event_code, desc
+
+def parse_file_worker(
+    job: Tuple[str, Path, int, str, Optional[int], int],
+) -> Tuple[int, List[EventParams]]:
+    """
+    Entry point per i processi worker: (engine, csv_file, device_id, source_log,
+    event_code, limit) → (righe viste, parametri). Non apre il DB: solo parsing.
+    """
+    engine, csv_file, device_id, source_log, event_code, limit = job
+    return PARSERS[engine](csv_file, device_id, source_log, event_code, limit)
 
 
 # ---------------------------------------------------------------------------
@@ -237,6 +568,23 @@ def main() -> None:
         default=100,
         help="Limite max eventi da inserire per ogni CSV (default 100).",
     )
+    ap.add_argument(
+        "--engine",
+        choices=sorted(PARSERS),
+        default="csv",
+        help="Motore di parsing CSV: 'csv' (stdlib, default) o 'pandas' (read_csv a blocchi, vettoriale).",
+    )
+    ap.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Processi per il parsing parallelo dei CSV (default 1 = seriale; utile solo con molti CSV grandi).",
+    )
+    ap.add_argument(
+        "--force",
+        action="store_true",
+        help="Ricarica anche i CSV invariati dall'ultimo load (ignora FILE_INGEST_STATE).",
+    )
     ap.add_argument(
         "--dry-run",
         action="store_true",
@@ -249,7 +597,7 @@ def main() -> None:
     if not dataset_root.is_dir():
         raise SystemExit(f"dataset-root non valida: {dataset_root}")
 
-    conn = sqlite3.connect(args.db)
+    conn = open_db(args.db, dry_run=args.dry_run)
     conn.row_factory = sqlite3.Row
 
     device_map = load_device_map(conn)
@@ -264,94 +612,111 @@ def main() -> None:
         print(f"[INFO] Filter event_code = {args.event_code}")
     if args.device_label:
         print(f"[INFO] Filter device_label = {args.device_label}")
+    print(f"[INFO] Engine: {args.engine}")
 
     total_seen = 0
     total_inserted = 0
+    total_unchanged = 0
+
+    load_key = f"{args.source_log}|{args.event_code}|{args.limit_per_run}"
+    if not args.dry_run:
+        conn.execute(INGEST_STATE_DDL)
+    ingest_state = {} if args.force else load_ingest_state(conn, load_key)
+
+    cur = conn.cursor()
 
+    files = []
     for device_label, tool_tag, run_id, csv_file in iter_main_log_csv_files(
         dataset_root=dataset_root,
         source_log=args.source_log,
         device_label_filter=args.device_label,
     ):
-        print(f"\n[FILE] {csv_file}")
-        print(f"       device_logical = {device_label}")
-        print(f"       tool_tag       = {tool_tag}")
-        print(f"       run_id         = {run_id}")
-
-        device_id = device_map.get(device_label)
-        if device_id is None:
-            print(f"  [WARN] Nessun device_id per '{device_label}', salto.")
-            continue
-
-        rows = event_rows_from_file(csv_file)
-        if not rows:
-            print("  [INFO] Nessun evento (o file vuoto/non supportato), salto.")
+        st = csv_file.stat()
+        file_state = (str(csv_file.resolve()), st.st_mtime, st.st_size)
+        if ingest_state.get(file_state[0]) == file_state[1:]:
+            print(f"[SKIP] {csv_file} invariato dall'ultimo load (mtime/size).")
+            total_unchanged += 1
             continue
+        files.append((device_label, tool_tag, run_id, csv_file, device_map.get(device_label), file_state))
+
+    jobs = [
+        (args.engine, csv_file, device_id, args.source_log, args.event_code, args.limit_per_run)
+        for _, _, _, csv_file, device_id, _ in files
+        if device_id is not None
+    ]
+
+    # Parsing CSV in parallelo sui worker (solo CPU, nessun DB);
+    # le INSERT restano sul processo principale, in ordine di file.
+    # Il pool parte (map sottomette subito tutti i job) PRIMA di BEGIN IMMEDIATE e
+    # locking_mode=EXCLUSIVE: nessun worker nasce con il lock di scrittura aperto.
+    executor: Optional[ProcessPoolExecutor] = None
+    if args.workers > 1 and len(jobs) > 1:
+        executor = ProcessPoolExecutor(max_workers=min(args.workers, len(jobs)))
+        # un job per CSV (niente chunksize): ogni file in coda resta cancellabile
+        results = executor.map(parse_file_worker, jobs)
+    else:
+        results = map(parse_file_worker, jobs)
 
-        inserted_for_file = 0
-        cur = conn.cursor()
+    try:
+        if not args.dry_run:
+            begin_bulk_load(conn)
 
-        for row in rows:
-            ts_utc_str, event_code, desc = extract_basic_fields(row)
-            total_seen += 1
+        for device_label, tool_tag, run_id, csv_file, device_id, file_state in files:
+            print(f"\n[FILE] {csv_file}")
+            print(f"       device_logical = {device_label}")
+            print(f"       tool_tag       = {tool_tag}")
+            print(f"       run_id         = {run_id}")
 
-            # filtro per EventID
-            if args.event_code is not None and event_code != args.event_code:
+            if device_id is None:
+                print(f"  [WARN] Nessun device_id per '{device_label}', salto.")
                 continue
 
-            # serve almeno qualcosa nel timestamp
-            if ts_utc_str is None:
+            seen, params = next(results)
+            total_seen += seen
+            if not args.dry_run:
+                # stessa transazione delle INSERT: stato e dati restano coerenti
+                path_key, mtime, size = file_state
+                cur.execute(UPSERT_INGEST_STATE, (path_key, load_key, mtime, size, len(params)))
+            if seen == 0:
+                print("  [INFO] Nessun evento (o file vuoto/non supportato), salto.")
                 continue
 
-            if inserted_for_file >= args.limit_per_run:
-                break
+            inserted_for_file = len(params)
+            total_inserted += inserted_for_file
 
             if args.dry_run:
-                print(
-                    f"  [DRY] Inserirei EVENTI_PC: ts={ts_utc_str}, "
-                    f"device_id={device_id}, source_log={args.source_log}, "
-                    f"event_code={event_code}"
-                )
-            else:
-                cur.execute(
-                    """
-                    INSERT INTO EVENTI_PC (
-                        timestamp_utc,
-                        device_id,
-                        source_log,
-                        event_code,
-                        account_id,
-                        ip_remoto,
-                        logon_type,
-                        process_name,
-                        command_line,
-                        description,
-                        sospetto_flag,
-                        motivazione_sospetto
-                    ) VALUES (?, ?, ?, ?, NULL, NULL, NULL, NULL, NULL, ?, 0, NULL)
-                    """,
-                    (
-                        ts_utc_str,
-                        device_id,
-                        args.source_log,
-                        event_code,
-                        desc,
-                    ),
-                )
-
-            inserted_for_file += 1
-            total_inserted += 1
+                for ts_utc_str, _, _, event_code, _ in params:
+                    print(
+                        f"  [DRY] Inserirei EVENTI_PC: ts={ts_utc_str}, "
+                        f"device_id={device_id}, source_log={args.source_log}, "
+                        f"event_code={event_code}"
+                    )
+            elif params:
+                # un solo executemany per file, dentro la transazione del bulk load
+                cur.executemany(INSERT_EVENTI_PC, params)
+
+            print(f"  [INFO] Eventi inseriti per questo file: {inserted_for_file}")
+    except BaseException:
+        if executor is not None:
+            # errore/Ctrl-C: i CSV ancora in coda non vanno parsati prima di uscire
+            executor.shutdown(cancel_futures=True)
+        if conn.in_transaction:
+            conn.rollback()
+        conn.close()
+        raise
 
-        if not args.dry_run:
-            conn.commit()
+    if executor is not None:
+        executor.shutdown()
 
-        print(f"  [INFO] Eventi inseriti per questo file: {inserted_for_file}")
+    if not args.dry_run:
+        end_bulk_load(conn)
 
     conn.close()
 
     print("\n[SUMMARY]")
     print(f"  Eventi visti (tutti i file): {total_seen}")
     print(f"  Eventi inseriti (dopo filtri/limiti): {total_inserted}")
+    print(f"  File saltati perché invariati: {total_unchanged}")
     if args.dry_run:
         print("  Modalità DRY-RUN: nessuna modifica reale al DB.")
 
@@ -9,9 +9,11 @@ Runner interattivo per la pipeline Takeout:
 3) Load EVENTI_ANDROID (m03_takeout_03_probe_load_to_EVENTI_ANDROID.py)
 """
 
+import importlib
 import os
 import sys
 import subprocess
+import traceback
 from pathlib import Path
 
 THIS_DIR = Path(__file__).resolve().parent
@@ -28,6 +30,18 @@ DEFAULTS = {
     "takeout_source": r"C:\Users\OMICRON\Desktop\Beb_Info_Fango\Takeout",
 }
 
+# menu principale: testo costante, scritto con un'unica write a ogni giro
+MAIN_MENU = "\n".join([
+    "",
+    "======================================",
+    "  M03 – TAKEOUT PIPELINE INTERATTIVA ",
+    "======================================",
+    "1) Estrazione Takeout → SAFENET",
+    "2) Validazione Takeout in SAFENET",
+    "3) Load EVENTI_ANDROID (probe)",
+    "4) Esci",
+]) + "\n"
+
 SOURCE_TYPES = [
     "PLAY_INSTALLS",
     "PLAY_ORDERS",
@@ -36,18 +50,39 @@ SOURCE_TYPES = [
     "ACCESS_LOG",
 ]
 
+# elenco sorgenti già formattato: una write invece di un print per riga
+SOURCE_MENU = "".join(
+    ["\nSorgenti disponibili da caricare in EVENTI_ANDROID:\n"]
+    + [f"  {idx}) {s}\n" for idx, s in enumerate(SOURCE_TYPES, start=1)]
+)
+
+
+# stdin da pipe / sessione registrata: lettura diretta da sys.stdin.readline,
+# senza il percorso PyOS_Readline di input(); interattivo resta input()
+INTERACTIVE = sys.stdin.isatty()
+
+
+def read_line(prompt: str) -> str:
+    if INTERACTIVE:
+        return input(prompt)
+    sys.stdout.write(prompt)
+    line = sys.stdin.readline()
+    if not line:
+        raise EOFError
+    return line.rstrip("\r\n")
+
 
 def ask(prompt: str, default: str | None = None) -> str:
     if default:
         full = f"{prompt} [{default}]: "
     else:
         full = f"{prompt}: "
-    val = input(full).strip()
+    val = read_line(full).strip()
     return val or (default or "")
 
 
 def pause():
-    input("\nPremi INVIO per continuare...")
+    read_line("\nPremi INVIO per continuare...")
 
 
 def run_subprocess(cmd: list[str]) -> int:
@@ -58,6 +93,48 @@ def run_subprocess(cmd: list[str]) -> int:
     return result.returncode
 
 
+def import_step(script: Path):
+    """
+    Import lazy del modulo dello step (stesso nome dello script), solo quando
+    lo step viene lanciato: l'avvio del menu non paga sqlite3/csv/... degli step.
+    Ritorna None se l'import fallisce.
+    """
+    try:
+        return importlib.import_module(script.stem)
+    except ImportError:
+        return None
+
+
+def run_step(script: Path, args: list[str]) -> int:
+    """
+    Esegue lo step in-process chiamando main() del modulo con un sys.argv sintetico
+    (niente avvio di un nuovo interprete). Se il modulo non è importabile usa
+    run_subprocess come prima.
+    """
+    module = import_step(script)
+    if module is None:
+        return run_subprocess([sys.executable, str(script), *args])
+
+    print("\n[DEBUG] Command (in-process):")
+    print("  " + " ".join([script.name, *args]))
+    print()
+    old_argv = sys.argv
+    sys.argv = [str(script), *args]
+    try:
+        module.main()
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            return e.code or 0
+        print(e.code, file=sys.stderr)
+        return 1
+    except Exception:
+        traceback.print_exc()
+        return 1
+    finally:
+        sys.argv = old_argv
+    return 0
+
+
 def step_extract():
     print("\n=== STEP 1: ESTRAZIONE TAKEOUT → SAFENET ===\n")
 
@@ -78,8 +155,6 @@ def step_extract():
     to_date = ask("Filtro TO date (YYYY-MM-DD, esclusiva) o vuoto per nessun filtro", "")
 
     cmd = [
-        sys.executable,
-        str(EXTRACT_SCRIPT),
         "--source", source,
         "--target", target,
         "--db", db,
@@ -90,7 +165,7 @@ def step_extract():
     if to_date:
         cmd += ["--to-date", to_date]
 
-    rc = run_subprocess(cmd)
+    rc = run_step(EXTRACT_SCRIPT, cmd)
     if rc == 0:
         print("\n[OK] Estrazione completata.")
     else:
@@ -111,15 +186,13 @@ def step_validate():
     takeout_label = ask("takeout_label (es. takeout_20251116_224500, vuoto = ultimo)", "")
 
     cmd = [
-        sys.executable,
-        str(VALIDATE_SCRIPT),
         "--dataset-root", dataset_root,
         "--account-label", account_label,
     ]
     if takeout_label:
         cmd += ["--takeout-label", takeout_label]
 
-    rc = run_subprocess(cmd)
+    rc = run_step(VALIDATE_SCRIPT, cmd)
     if rc == 0:
         print("\n[OK] Validazione terminata (controlla eventuali WARN/ERROR nel log sopra).")
     else:
@@ -127,14 +200,12 @@ def step_validate():
 
 
 def choose_source_type() -> str:
-    print("\nSorgenti disponibili da caricare in EVENTI_ANDROID:")
-    for idx, s in enumerate(SOURCE_TYPES, start=1):
-        print(f"  {idx}) {s}")
+    sys.stdout.write(SOURCE_MENU)
     while True:
-        choice = input("Seleziona sorgente (numero): ").strip()
+        choice = read_line("Seleziona sorgente (numero): ").strip()
         if not choice:
             continue
-        if not choice.isdigit():
+        if not choice.isdecimal():
             print("Inserisci un numero valido.")
             continue
         i = int(choice)
@@ -163,14 +234,9 @@ def step_load():
     print(f"[INFO] Source-type scelto: {src_type}")
 
     limit_str = ask("limit-per-run (max eventi da inserire, default 500)", "500")
-    try:
-        limit = int(limit_str)
-    except ValueError:
-        limit = 500
+    limit = int(limit_str) if limit_str.isdecimal() else 500
 
     cmd = [
-        sys.executable,
-        str(LOAD_SCRIPT),
         "--dataset-root", dataset_root,
         "--db", db,
         "--account-label", account_label,
@@ -180,38 +246,35 @@ def step_load():
     if takeout_label:
         cmd += ["--takeout-label", takeout_label]
 
-    rc = run_subprocess(cmd)
+    rc = run_step(LOAD_SCRIPT, cmd)
     if rc == 0:
         print("\n[OK] Load completato.")
     else:
         print(f"\n[ERROR] Load terminato con codice {rc}.")
 
 
+# scelta menu -> step (la pausa dopo lo step è comune a tutti)
+MENU_ACTIONS = {
+    "1": step_extract,
+    "2": step_validate,
+    "3": step_load,
+}
+
+
 def main_menu():
     while True:
-        print("\n======================================")
-        print("  M03 – TAKEOUT PIPELINE INTERATTIVA ")
-        print("======================================")
-        print("1) Estrazione Takeout → SAFENET")
-        print("2) Validazione Takeout in SAFENET")
-        print("3) Load EVENTI_ANDROID (probe)")
-        print("4) Esci")
-        choice = input("\nSeleziona un'operazione: ").strip()
-
-        if choice == "1":
-            step_extract()
-            pause()
-        elif choice == "2":
-            step_validate()
-            pause()
-        elif choice == "3":
-            step_load()
-            pause()
-        elif choice == "4":
+        sys.stdout.write(MAIN_MENU)
+        choice = read_line("\nSeleziona un'operazione: ").strip()
+
+        if choice == "4":
             print("Bye.")
             break
-        else:
+        action = MENU_ACTIONS.get(choice)
+        if action is None:
             print("Scelta non valida.")
+            continue
+        action()
+        pause()
 
 
 if __name__ == "__main__":
@@ -1,5 +1,5 @@
 #!/usr/bin/env python3
-import argparse, datetime as dt, json, os, shutil, sqlite3, subprocess, sys
+import argparse, datetime as dt, errno, json, os, shutil, sqlite3, stat, subprocess, sys
 from pathlib import Path
 
 def parse_args():
@@ -12,6 +12,73 @@ def parse_args():
     p.add_argument("--to-date")
     return p.parse_args()
 
+def open_db(path):
+    # autocommit + PRAGMA per scritture veloci (WAL, synchronous=NORMAL)
+    c = sqlite3.connect(path, isolation_level=None)
+    c.executescript("PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL; PRAGMA temp_store=MEMORY; "
+                    "PRAGMA mmap_size=268435456; PRAGMA cache_size=-131072;")
+    return c
+
+def _copy_file_range(src, dst):
+    # Linux: copia in-kernel (reflink su btrfs/XFS), nessun passaggio in userspace
+    with open(src, "rb") as fs, open(dst, "wb") as fd:
+        # lettura una tantum e sequenziale: readahead aggressivo dal kernel (disco freddo)
+        os.posix_fadvise(fs.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        remaining = os.fstat(fs.fileno()).st_size
+        while remaining > 0:
+            n = os.copy_file_range(fs.fileno(), fd.fileno(), remaining)
+            if n == 0: break
+            remaining -= n
+    shutil.copystat(src, dst)
+
+def _clonefile(src, dst):
+    # macOS/APFS: clone copy-on-write (solo metadati)
+    import ctypes, ctypes.util
+    libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+    if libc.clonefile(os.fsencode(src), os.fsencode(dst), 0) != 0:
+        err = ctypes.get_errno()
+        raise OSError(err, os.strerror(err), str(dst))
+
+def _hardlink(src, dst):
+    # NTFS: hardlink O(1) per file, ma solo se il sorgente è in sola lettura: un file
+    # modificabile condividerebbe l'inode con la cartella Takeout viva, e una modifica
+    # in place del sorgente cambierebbe la copia di acquisizione
+    if os.stat(src).st_mode & stat.S_IWRITE:
+        shutil.copy2(src, dst)
+    else:
+        os.link(src, dst)
+
+# errno che indicano "fast path non supportato qui" (filesystem/volume), non un
+# problema del singolo file: solo questi lo disattivano per il resto della copia
+_FAST_UNSUPPORTED = {errno.EXDEV, errno.ENOTSUP, errno.EOPNOTSUPP, errno.EINVAL, errno.ENOSYS}
+
+def make_copy_function():
+    """copy_function per copytree: prova la copia zero-copy della piattaforma e,
+    al primo errore non legato al singolo file, ripiega per sempre su shutil.copy2."""
+    if sys.platform.startswith("linux") and hasattr(os, "copy_file_range") and hasattr(os, "posix_fadvise"): fast = _copy_file_range
+    elif sys.platform == "darwin": fast = _clonefile
+    elif os.name == "nt": fast = _hardlink
+    else: fast = None
+    state = {"fast": fast}
+
+    def copy(src, dst):
+        if state["fast"] is not None:
+            try:
+                state["fast"](src, dst)
+                return dst
+            except FileExistsError:
+                os.remove(dst)
+                try:
+                    state["fast"](src, dst)
+                    return dst
+                except OSError as e:
+                    if e.errno in _FAST_UNSUPPORTED: state["fast"] = None
+            except OSError as e:
+                # errore del singolo file (es. permessi): copy2 solo per questo file
+                if e.errno in _FAST_UNSUPPORTED: state["fast"] = None
+        return shutil.copy2(src, dst)
+    return copy
+
 def resolve_account_id(conn, label):
     cur = conn.cursor()
     cur.execute("SELECT account_id FROM ACCOUNT_MASTER WHERE account_label=?", (label,))
@@ -19,9 +86,11 @@ def resolve_account_id(conn, label):
     if not row: raise SystemExit(f"[ERROR] Account '{label}' non trovato.")
     return int(row[0])
 
-def insert_takeout_acquisition(conn, account_id, tlabel, src, dst, tool_ver):
+def insert_takeout_acquisition(conn, account_id, tlabel, src, dst, tool_ver, ts):
     cur = conn.cursor()
-    ts = dt.datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")
+    # unico writer: lock esclusivo tenuto fino a conn.close()
+    cur.execute("PRAGMA locking_mode=EXCLUSIVE")
+    cur.execute("BEGIN IMMEDIATE")
     cur.execute("""
         INSERT INTO TAKEOUT_ACQUISITIONS
         (account_id,takeout_label,source_root_path,safenet_root_path,acquisition_ts_utc,tool_version)
@@ -36,11 +105,14 @@ def main():
     target = Path(a.target).resolve()
     db = Path(a.db).resolve()
 
-    conn = sqlite3.connect(db)
+    conn = open_db(db)
     account_id = resolve_account_id(conn, a.account_label)
     conn.close()
 
-    run_id = dt.datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+    # timestamp unico della run: usato per run_id, meta e TAKEOUT_ACQUISITIONS
+    run_utc = dt.datetime.now(dt.timezone.utc)
+    run_utc_iso = run_utc.strftime("%Y-%m-%dT%H:%M:%SZ")
+    run_id = run_utc.strftime("%Y%m%d_%H%M%S")
     tlabel = f"TAKEOUT_{run_id}"
 
     run_dir = target / a.account_label / f"takeout_{run_id}"
@@ -53,10 +125,11 @@ def main():
     meta_dir.mkdir(parents=True, exist_ok=True)
 
     print("[INFO] Copy RAW_ALL...")
+    copy_fn = make_copy_function()
     for item in source.iterdir():
         dest = raw_dir / item.name
-        if item.is_dir(): shutil.copytree(item, dest, dirs_exist_ok=True)
-        else: shutil.copy2(item, dest)
+        if item.is_dir(): shutil.copytree(item, dest, dirs_exist_ok=True, copy_function=copy_fn)
+        else: copy_fn(item, dest)
 
     report_script = Path(__file__).parent / "generate_takeout_report.py"
     cmd = [sys.executable, str(report_script), "--takeout-dir", str(raw_dir), "--report-dir", str(rep_dir)]
@@ -77,13 +150,13 @@ def main():
         "source_root_path": str(source),
         "safenet_root_path": str(run_dir),
         "report_dir": str(rep_dir),
-        "created_utc": dt.datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "created_utc": run_utc_iso,
         "from_date": a.from_date,
         "to_date": a.to_date
     }
 
-    conn = sqlite3.connect(db)
-    tid = insert_takeout_acquisition(conn, account_id, tlabel, source, run_dir, "generate_takeout_report.py")
+    conn = open_db(db)
+    tid = insert_takeout_acquisition(conn, account_id, tlabel, source, run_dir, "generate_takeout_report.py", run_utc_iso)
     conn.close()
 
     meta["takeout_id"] = tid
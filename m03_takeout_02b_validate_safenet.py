@@ -1,7 +1,9 @@
 #!/usr/bin/env python3
-import argparse, csv, json
+import argparse, csv, json, os
 from pathlib import Path
 
+ROWCACHE=".rowcache.json"  # in REPORT: {file: [mtime_ns, size, righe]}
+
 def parse():
     p=argparse.ArgumentParser()
     p.add_argument("--dataset-root", required=True)
@@ -10,23 +12,51 @@ def parse():
     return p.parse_args()
 
 def count_rows(p):
-    if not p.is_file(): return 0
-    with p.open() as f:
-        r=csv.reader(f); next(r,None)
-        return sum(1 for _ in r)
+    # niente is_file() prima dell'open: un solo syscall, il file mancante è l'eccezione
+    try: f=p.open("rb")
+    except (FileNotFoundError, IsADirectoryError): return 0
+    # righe = '\n' contati in C a blocchi da 1 MB; se il file ha virgolette
+    # (possibili newline dentro i campi) si torna al conteggio esatto con csv
+    n=0; last=b"\n"; quoted=False
+    with f:
+        for chunk in iter(lambda: f.read(1<<20), b""):
+            if b'"' in chunk: quoted=True; break
+            n+=chunk.count(b"\n"); last=chunk[-1:]
+    if quoted:
+        with p.open(newline="") as f:
+            r=csv.reader(f); next(r,None)
+            return sum(1 for _ in r)
+    if last!=b"\n": n+=1  # ultima riga senza newline finale
+    return max(n-1,0)
+
+def load_rowcache(rep):
+    try: return json.loads((rep/ROWCACHE).read_text(encoding="utf-8"))
+    except (OSError, ValueError): return {}
+
+def save_rowcache(rep, cache):
+    try: (rep/ROWCACHE).write_text(json.dumps(cache, indent=1), encoding="utf-8")
+    except OSError as e: print(f"[WARN] {ROWCACHE} non scritto: {e}")
+
+def cached_count_rows(p, cache):
+    # CSV invariato (stesso mtime_ns e size) -> conteggio dalla cache, niente riscansione
+    st=p.stat(); sig=[st.st_mtime_ns, st.st_size]
+    hit=cache.get(p.name)
+    if hit and hit[:2]==sig: return hit[2]
+    n=count_rows(p); cache[p.name]=sig+[n]
+    return n
 
 def load_summary(p):
-    if not p.is_file(): return {}
-    with p.open() as f:
+    try: f=p.open()
+    except (FileNotFoundError, IsADirectoryError): return {}
+    with f:
         r=csv.DictReader(f)
         out={}
         for row in r:
             out[row["metric"]]=row["value"]
         return out
 
-def validate_pair(data, summ, metric):
-    rows = count_rows(data)
-    summary = load_summary(summ)
+def validate_pair(data, summary, metric, cache):
+    rows = cached_count_rows(data, cache)
     exp = summary.get(metric)
     if exp is None:
         return ("WARN", f"{data.name}: metric '{metric}' assente")
@@ -42,9 +72,10 @@ def main():
     if a.takeout_label:
         run=acc/a.takeout_label
     else:
-        runs=[p for p in acc.iterdir() if p.is_dir() and p.name.startswith("takeout_")]
-        if not runs: raise SystemExit("Nessun takeout trovato.")
-        run=sorted(runs)[-1]
+        # un solo scandir: DirEntry.is_dir() non rifà stat, max() al posto del sort
+        latest=max((e.name for e in os.scandir(acc) if e.name.startswith("takeout_") and e.is_dir()), default=None)
+        if not latest: raise SystemExit("Nessun takeout trovato.")
+        run=acc/latest
 
     rep=run/"REPORT"
     print(f"[INFO] Validating: {run}")
@@ -58,6 +89,10 @@ def main():
         ("access_log.csv","access_log_summary.csv","total_rows"),
     ]
 
+    # ogni summary letto una volta sola, anche se usato per più metriche
+    summaries={summ: load_summary(rep/summ) for summ in {s for _,s,_ in pairs}}
+    cache=load_rowcache(rep); before=json.dumps(cache, sort_keys=True)
+
     for data, summ, metric in pairs:
         dp=rep/data; sp=rep/summ
         if not dp.exists(): 
@@ -66,9 +101,11 @@ def main():
         if not sp.exists():
             print(f"[WARN] Missing {sp.name}")
             continue
-        s,m=validate_pair(dp,sp,metric)
+        s,m=validate_pair(dp,summaries[summ],metric,cache)
         tag="[CHECK]" if s=="OK" else "[WARN]"
         print(tag,m)
 
+    if json.dumps(cache, sort_keys=True)!=before: save_rowcache(rep, cache)
+
 if __name__=="__main__":
     main()
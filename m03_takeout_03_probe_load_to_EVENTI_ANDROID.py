@@ -1,8 +1,29 @@
 #!/usr/bin/env python3
-import argparse, csv, sqlite3, json
+import argparse, csv, sqlite3, json, os
+from itertools import islice
 from pathlib import Path
 
 SRC=["PLAY_INSTALLS","PLAY_ORDERS","PLAY_PURCHASES","PLAY_SUBSCRIPTIONS","ACCESS_LOG"]
+SRC_FILES={"PLAY_INSTALLS":"installs.csv","PLAY_ORDERS":"orders.csv","PLAY_PURCHASES":"purchases.csv",
+           "PLAY_SUBSCRIPTIONS":"subscriptions.csv","ACCESS_LOG":"access_log.csv"}
+BATCH=10000  # righe per executemany
+# SQL costante: stesso testo a ogni executemany -> statement preparato riusato dalla cache di sqlite3
+# colonne reali di EVENTI_ANDROID (forensics.sql): source/subtype/importo finiscono in extra_details
+INSERT_SQL="""
+    INSERT INTO EVENTI_ANDROID
+    (timestamp_utc,device_id,account_id,product,app,title,title_url,
+     source_file,ip_remoto,extra_details)
+    VALUES (?,?,?,?,?,?,NULL, ?,?,?)
+"""
+
+# colonne candidate nei CSV di REPORT (vince la prima presente, case-insensitive)
+COLS={"ts":("timestamp_utc","timestamp","time","date"),
+      "prod":("product",),
+      "app":("app","package_name","package"),
+      "title":("title","name","description","activity"),
+      "ip":("ip_remoto","ip_address","ip"),
+      "amt":("amount","price","total"),
+      "curr":("currency_code","currency")}
 
 def parse():
     p=argparse.ArgumentParser()
@@ -10,10 +31,18 @@ def parse():
     p.add_argument("--db", required=True)
     p.add_argument("--account-label", required=True)
     p.add_argument("--takeout-label")
+    p.add_argument("--device-label", help="DEVICE_MASTER.device_label (default: main_device_id dell'account)")
     p.add_argument("--source-type", required=True, choices=SRC)
     p.add_argument("--limit-per-run", type=int, default=1000)
     return p.parse_args()
 
+def open_db(path):
+    # autocommit: la transazione del load è esplicita (BEGIN IMMEDIATE ... COMMIT)
+    c=sqlite3.connect(path, isolation_level=None)
+    c.executescript("PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL; PRAGMA temp_store=MEMORY; "
+                    "PRAGMA cache_size=-200000; PRAGMA cache_spill=OFF;")
+    return c
+
 def resolve_account_id(conn, label):
     cur=conn.cursor()
     cur.execute("SELECT account_id FROM ACCOUNT_MASTER WHERE account_label=?", (label,))
@@ -21,29 +50,108 @@ def resolve_account_id(conn, label):
     if not r: raise SystemExit("Account non trovato")
     return r[0]
 
+def resolve_device_id(conn, account_label, device_label=None):
+    # EVENTI_ANDROID.device_id è NOT NULL: device esplicito oppure device principale dell'account
+    cur=conn.cursor()
+    if device_label:
+        cur.execute("SELECT device_id FROM DEVICE_MASTER WHERE device_label=?", (device_label,))
+    else:
+        cur.execute("SELECT main_device_id FROM ACCOUNT_MASTER WHERE account_label=?", (account_label,))
+    r=cur.fetchone()
+    if not r or r[0] is None:
+        raise SystemExit(f"Device non trovato ({device_label or 'main_device_id di '+account_label}): usa --device-label")
+    return r[0]
+
 def get_run(dataset,acc,lab):
     accdir=dataset/acc
     if lab:
         return accdir/lab
-    r=[p for p in accdir.iterdir() if p.is_dir() and p.name.startswith("takeout_")]
-    if not r: raise SystemExit("No takeout_*")
-    return sorted(r)[-1]
-
-def insert_event(cur,ts,acc,prod,app,title,sub,file,ip=None,amt=None,curr=None,extra=None):
-    cur.execute("""
-        INSERT INTO EVENTI_ANDROID
-        (timestamp_utc,account_id,product,app,title,source,source_subtype,
-         source_file,ip_remoto,amount,currency_code,extra_details)
-        VALUES (?,?,?,?,?,?,?, ?,?,?,?,?)
-    """,(ts,acc,prod,app,title,"TAKEOUT",sub,file,ip,amt,curr,extra))
-
-def load_generic(path, limit, handler):
-    with path.open() as f:
-        r=csv.DictReader(f)
-        for idx,row in enumerate(r,1):
-            yield idx,row
-            if idx>=limit: break
+    latest=max((e.name for e in os.scandir(accdir) if e.name.startswith("takeout_") and e.is_dir()), default=None)
+    if not latest: raise SystemExit("No takeout_*")
+    return accdir/latest
+
+def insert_event(buf,ts,dev,acc,prod,app,title,sub,file,ip=None,amt=None,curr=None,row=None):
+    # accoda la riga: l'INSERT vero avviene in flush() a blocchi di BATCH.
+    # I campi senza colonna in EVENTI_ANDROID vanno nel JSON di extra_details
+    extra=json.dumps({"source":"TAKEOUT","source_subtype":sub,"amount":amt,
+                      "currency_code":curr,"row":row},ensure_ascii=False)
+    buf.append((ts,dev,acc,prod,app,title,file,ip,extra))
+
+def flush(cur,buf):
+    if buf: cur.executemany(INSERT_SQL,buf)
+    n=len(buf); buf.clear()
+    return n
+
+def header_index(header):
+    # nome colonna -> indice; con nomi duplicati vale la prima occorrenza
+    idx={}
+    for i,name in enumerate(header): idx.setdefault(name.strip(),i)
+    return idx
+
+def unique_names(header):
+    # chiavi per il JSON della riga: i duplicati diventano nome_2, nome_3, ... (nessun valore perso)
+    seen={}; out=[]
+    for name in header:
+        n=seen[name]=seen.get(name,0)+1
+        out.append(name if n==1 else f"{name}_{n}")
+    return out
+
+def pick(idx, names):
+    low={k.lower():i for k,i in idx.items()}
+    return next((low[n] for n in names if n in low), None)
+
+def cell(row,i):
+    if i is None or i>=len(row): return None
+    return row[i].strip() or None
+
+def load_generic(path, limit):
+    # csv.reader + indici di colonna: niente dict per riga, lettura in streaming.
+    # Primo elemento = header grezzo (lista, anche con duplicati), poi al massimo
+    # `limit` righe (liste). utf-8-sig: il BOM non finisce nel nome della prima colonna
+    with path.open(newline="", encoding="utf-8-sig") as f:
+        r=csv.reader(f)
+        yield [name.strip() for name in next(r,[])]
+        yield from islice(r, limit)
 
 def main():
     a=parse()
-    dataset=Path(a.dataset-root)  # FIX BELOW in final message
+    dataset=Path(a.dataset_root).resolve()  # source_file assoluto, indipendente dalla cwd
+    run=get_run(dataset,a.account_label,a.takeout_label)
+    path=run/"REPORT"/SRC_FILES[a.source_type]
+    if not path.is_file(): raise SystemExit(f"File mancante: {path}")
+    print(f"[INFO] Loading {a.source_type} da {path}")
+
+    conn=open_db(a.db)
+    # account e device risolti una volta qui e passati a ogni riga
+    acc=resolve_account_id(conn,a.account_label)
+    dev=resolve_device_id(conn,a.account_label,a.device_label)
+    rows=load_generic(path,a.limit_per_run)
+    names=next(rows)
+    idx=header_index(names)
+    col={k:pick(idx,v) for k,v in COLS.items()}
+    if col["ts"] is None: raise SystemExit(f"Nessuna colonna timestamp in {path.name}")
+    keys=unique_names(names)
+    prod_default="Google Play" if a.source_type.startswith("PLAY_") else "Google"
+
+    cur=conn.cursor(); buf=[]; seen=ins=0
+    cur.execute("BEGIN IMMEDIATE")
+    try:
+        for row in rows:
+            seen+=1
+            ts=cell(row,col["ts"])
+            if not ts: continue
+            insert_event(buf,ts,dev,acc,cell(row,col["prod"]) or prod_default,cell(row,col["app"]),
+                         cell(row,col["title"]),a.source_type,str(path),cell(row,col["ip"]),
+                         cell(row,col["amt"]),cell(row,col["curr"]),
+                         dict(zip(keys,row)))
+            if len(buf)>=BATCH: ins+=flush(cur,buf)
+        ins+=flush(cur,buf)
+        conn.commit()
+    except BaseException:
+        conn.rollback(); conn.close()
+        raise
+    conn.close()
+    print(f"[INFO] Righe lette: {seen}, inserite: {ins}")
+
+if __name__=="__main__":
+    main()
@@ -32,9 +32,22 @@
 import argparse
 import hashlib
 import json
+import mmap
+import os
 import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from functools import lru_cache
+from itertools import islice
 from pathlib import Path
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, List, Set, Tuple, Optional
+
+try:
+    import orjson  # opzionale: parser C piu' veloce, accetta direttamente bytes
+except ImportError:
+    orjson = None
+
 
 # ---------------- CONFIG CATEGORIE (DEVE MATCHARE LO SCRIPT DI COPIA) ----------------
 
@@ -76,6 +89,21 @@ CATEGORY_PREFIXES: Dict[str, str] = {
 
 RUN_SUBDIRS = ["META", "CORE_SYSTEM", "CONNECTIVITY", "APPS_PACKAGES", "RAW_ALL"]
 
+# sopra questa soglia l'hash si fa su una mmap del file (nessuna copia in userspace)
+HASH_MMAP_THRESHOLD = 8 * 1024 * 1024
+
+# run validate in parallelo: lavoro di stat/scandir/lettura e SHA256 (hashlib rilascia il GIL)
+DEFAULT_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+# <brand>_<model>_<serial>_<YYYYMMDD_HHMMSS>, compilata una volta sola
+_RUN_FOLDER_RE = re.compile(r"^(.*)_(20\d{6}_\d{6})$")
+
+# proiezione dei soli campi usati per disambiguare, direttamente sui bytes del meta.
+# ro.serialno si cerca solo dentro l'oggetto adb_info (piatto: nessuna graffa interna)
+_ADB_INFO_RE = re.compile(rb'"adb_info"\s*:\s*\{([^{}]*)\}')
+_SERIAL_RE = re.compile(rb'"ro\.serialno"\s*:\s*"([^"\\]*)"')
+_BMS_RE = re.compile(rb'"brand_model_serial"\s*:\s*"([^"\\]*)"')
+
 
 # ---------------- FUNZIONI UTILI ----------------
 
@@ -85,7 +113,7 @@ def parse_run_folder_name(folder_name: str) -> Tuple[str, str]:
       <brand>_<model>_<serial>_<YYYYMMDD_HHMMSS>
     Restituisce (brand_model_serial, run_id) oppure (folder_name, "unknown_run").
     """
-    m = re.match(r"^(.*)_(20\d{6}_\d{6})$", folder_name)
+    m = _RUN_FOLDER_RE.match(folder_name)
     if not m:
         return folder_name, "unknown_run"
 
@@ -107,53 +135,182 @@ def extract_serial_from_bms(brand_model_serial: str) -> str:
     return ""
 
 
+def build_prefix_trie(prefixes: Dict[str, str]) -> dict:
+    """
+    Trie dei prefissi: un nodo è un dict carattere -> nodo figlio; la chiave ""
+    (mai un carattere) marca la fine di un prefisso con (posizione nel dict,
+    categoria). La posizione conserva la preferenza del loop lineare quando un
+    prefisso è contenuto in un altro (es. dmesg_ / dmesg_su_).
+    """
+    trie: dict = {}
+    for priority, (prefix, category) in enumerate(prefixes.items()):
+        node = trie
+        for ch in prefix:
+            node = node.setdefault(ch, {})
+        node[""] = (priority, category)
+    return trie
+
+
+# costruito una volta all'import: la classificazione scende il trie carattere per
+# carattere, costo legato alla lunghezza del prefisso e non al numero di prefissi
+_PREFIX_TRIE = build_prefix_trie(CATEGORY_PREFIXES)
+
+
 def classify_category(filename: str) -> str:
-    fname = filename.lower()
-    for prefix, cat in CATEGORY_PREFIXES.items():
-        if fname.startswith(prefix):
-            return cat
-    return ""
+    # chiave di cache normalizzata: nomi che differiscono solo nel case non
+    # occupano voci separate
+    return _classify_lower(filename.lower())
+
+
+@lru_cache(maxsize=4096)
+def _classify_lower(lower_name: str) -> str:
+    node = _PREFIX_TRIE
+    best = None
+    for ch in lower_name:
+        node = node.get(ch)
+        if node is None:
+            break
+        hit = node.get("")
+        if hit is not None and (best is None or hit[0] < best[0]):
+            best = hit
+    return best[1] if best else ""
+
+
+def list_file_names(folder: str) -> Optional[Set[str]]:
+    """
+    Nomi dei file in `folder` con un solo scandir (al posto di un exists() per file).
+    None se la cartella non esiste.
+    """
+    try:
+        with os.scandir(folder) as it:
+            return {e.name for e in it if e.is_file()}
+    except (FileNotFoundError, NotADirectoryError):
+        return None
 
 
-def sha256_file(path: Path, chunk_size: int = 1024 * 1024) -> str:
-    h = hashlib.sha256()
-    with path.open("rb") as f:
-        while True:
-            chunk = f.read(chunk_size)
-            if not chunk:
-                break
+def scan_files(folder) -> List[os.DirEntry]:
+    """
+    File di `folder` con un solo scandir. Il tipo arriva da readdir e
+    DirEntry.stat() resta in cache (su Windows è già incluso nella lettura).
+    """
+    with os.scandir(folder) as it:
+        return [e for e in it if e.is_file()]
+
+
+def sha256_file(path, chunk_size: int = 1024 * 1024) -> str:
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size > HASH_MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return hashlib.sha256(mm).hexdigest()
+        if hasattr(hashlib, "file_digest"):  # Python 3.11+: loop di lettura in C
+            return hashlib.file_digest(f, "sha256").hexdigest()
+        h = hashlib.sha256()
+        for chunk in iter(lambda: f.read(chunk_size), b""):
             h.update(chunk)
-    return h.hexdigest()
+        return h.hexdigest()
+
+
+def same_file(src: os.DirEntry, src_st, dst: os.DirEntry, dst_st) -> bool:
+    """
+    True se src e dst sono lo stesso file su disco (hardlink o stessa entry).
+    POSIX: (st_dev, st_ino) dagli stat già in cache. Su Windows lo stat di
+    DirEntry ha st_ino = 0, quindi si passa da os.path.samefile.
+    """
+    if os.name == "nt":
+        try:
+            return os.path.samefile(src.path, dst.path)
+        except OSError:
+            return False
+    return (src_st.st_dev, src_st.st_ino) == (dst_st.st_dev, dst_st.st_ino)
+
+
+def loads_json(raw: bytes):
+    """
+    Parse JSON da bytes: orjson se installato, altrimenti json della stdlib.
+    """
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def index_runs(dataset_root: str, script_tag: str) -> Dict[str, Tuple[str, ...]]:
+    """
+    Indice run_id -> cartelle dataset_root/<device>/<script_tag>/<run_id>/.
+    Costruito una volta in main a profondità fissa (scandir della root, poi uno
+    per device) e passato a validate_run: ogni lookup diventa un accesso al dict.
+    L'ordine dei candidati segue quello dei device nella root.
+    """
+    index: Dict[str, List[str]] = {}
+    with os.scandir(dataset_root) as it:
+        device_paths = [e.path for e in it if e.is_dir()]
+    for device_path in device_paths:
+        try:
+            with os.scandir(os.path.join(device_path, script_tag)) as it:
+                for e in it:
+                    if e.is_dir():
+                        index.setdefault(e.name, []).append(e.path)
+        except OSError:
+            continue
+    return {run_id: tuple(paths) for run_id, paths in index.items()}
+
+
+@lru_cache(maxsize=None)
+def load_meta_serials(meta_path: str) -> Optional[Tuple[str, str]]:
+    """
+    (adb_info.ro.serialno, brand_model_serial) da acquisition_meta.json, letto una
+    sola volta per file. Prima regex sui bytes grezzi (niente dict completo): solo
+    se ro.serialno è dentro adb_info e brand_model_serial compare una volta sola,
+    entrambi senza escape. In ogni altro caso parse completo.
+    None se il file manca o non è JSON valido.
+    """
+    try:
+        with open(meta_path, "rb") as f:
+            raw = f.read()
+    except OSError:
+        return None
+
+    m_adb = _ADB_INFO_RE.search(raw)
+    m_serial = _SERIAL_RE.search(m_adb.group(1)) if m_adb else None
+    bms = _BMS_RE.findall(raw)
+    if m_serial and len(bms) == 1:
+        return (
+            m_serial.group(1).decode("utf-8", "replace").strip(),
+            bms[0].decode("utf-8", "replace").strip(),
+        )
+
+    try:
+        meta = loads_json(raw)
+    except Exception:
+        return None
+    if not isinstance(meta, dict):
+        return None
+    adb_info = meta.get("adb_info", {})
+    ro_serial = ""
+    if isinstance(adb_info, dict):
+        ro_serial = str(adb_info.get("ro.serialno", "")).strip()
+    return ro_serial, str(meta.get("brand_model_serial", "")).strip()
 
 
 def find_run_base_by_runid_and_serial(
     dataset_root: Path,
-    script_tag: str,
+    run_index: Dict[str, Tuple[str, ...]],
     run_id: str,
     serial: str,
-) -> Tuple[Optional[Path], List[str]]:
+) -> Tuple[Optional[str], List[str]]:
     """
     Cerca la cartella di destinazione della run usando:
-      - script_tag = "android_log_dump_0.2"
+      - run_index = indice run_id -> cartelle (vedi index_runs)
       - run_id = "YYYYMMDD_HHMMSS"
       - serial = es. "RZCX60536TD"
     Strategia:
-      1) Cerca tutte le cartelle dataset_root/*/<script_tag>/<run_id>/
+      1) Cerca tutte le cartelle dataset_root/*/<script_tag>/<run_id>/ nell'indice
       2) Se ce n'è una sola -> OK
       3) Se più di una -> prova a leggere META/acquisition_meta.json e matchare serial:
          - adb_info.ro.serialno oppure brand_model_serial
-    Ritorna (run_base_path o None, warnings).
+    Ritorna (run_base_path come str o None, warnings).
     """
     warnings: List[str] = []
-    candidates: List[Path] = []
-
-    for device_dir in dataset_root.iterdir():
-        if not device_dir.is_dir():
-            continue
-        script_dir = device_dir / script_tag
-        run_dir = script_dir / run_id
-        if run_dir.is_dir():
-            candidates.append(run_dir)
+    candidates = run_index.get(run_id, ())
 
     if not candidates:
         warnings.append(
@@ -165,23 +322,14 @@ def find_run_base_by_runid_and_serial(
         return candidates[0], warnings
 
     # Più candidati, tentiamo match serial via META
-    matched: List[Path] = []
+    matched: List[str] = []
     for c in candidates:
-        meta_path = c / "META" / "acquisition_meta.json"
-        if not meta_path.exists():
-            continue
-        try:
-            meta = json.loads(meta_path.read_text(encoding="utf-8"))
-        except Exception:
+        serials = load_meta_serials(os.path.join(c, "META", "acquisition_meta.json"))
+        if serials is None:
             continue
 
-        # prova con adb_info.ro.serialno
-        adb_info = meta.get("adb_info", {})
-        ro_serial = ""
-        if isinstance(adb_info, dict):
-            ro_serial = str(adb_info.get("ro.serialno", "")).strip()
-
-        meta_bms = str(meta.get("brand_model_serial", "")).strip()
+        # adb_info.ro.serialno oppure brand_model_serial
+        ro_serial, meta_bms = serials
 
         if serial and ro_serial and serial in ro_serial:
             matched.append(c)
@@ -212,9 +360,9 @@ def find_run_base_by_runid_and_serial(
 def validate_run(
     run_dir: Path,
     dataset_root: Path,
-    script_name: str,
-    script_version: str,
+    run_index: Dict[str, Tuple[str, ...]],
     use_hash: bool,
+    hash_pool: Optional[ThreadPoolExecutor] = None,
 ) -> Dict[str, object]:
     """
     Valida una singola run:
@@ -230,8 +378,6 @@ def validate_run(
     """
     brand_model_serial, run_id = parse_run_folder_name(run_dir.name)
     serial = extract_serial_from_bms(brand_model_serial)
-    script_tag = f"{script_name}_{script_version}"
-
     info = {
         "run_dir": str(run_dir),
         "brand_model_serial": brand_model_serial,
@@ -250,7 +396,7 @@ def validate_run(
 
     run_base, warn_find = find_run_base_by_runid_and_serial(
         dataset_root=dataset_root,
-        script_tag=script_tag,
+        run_index=run_index,
         run_id=run_id,
         serial=serial,
     )
@@ -260,33 +406,54 @@ def validate_run(
         errors.append("Cartella target run_base NON trovata per questa run.")
         return {"info": info, "errors": errors, "warnings": warnings}
 
-    info["run_base"] = str(run_base)
+    # da qui run_base resta str: os.path sui percorsi interni, niente Path intermedi
+    info["run_base"] = run_base
     # device_logical = directory subito sotto dataset_root
-    try:
-        # dataset_root / <device_logical> / script_tag / run_id
-        device_logical = run_base.parent.parent.name
-    except Exception:
-        device_logical = ""
+    # dataset_root / <device_logical> / script_tag / run_id
+    device_logical = os.path.basename(os.path.dirname(os.path.dirname(run_base)))
     info["device_logical"] = device_logical
 
-    raw_all_dir = run_base / "RAW_ALL"
-    if not raw_all_dir.exists():
+    raw_all_dir = os.path.join(run_base, "RAW_ALL")
+    if not os.path.exists(raw_all_dir):
         errors.append(f"RAW_ALL mancante: {raw_all_dir}")
         return {"info": info, "errors": errors, "warnings": warnings}
 
-    # indicizziamo RAW_ALL
-    raw_files: Dict[str, Path] = {}
-    for p in raw_all_dir.iterdir():
-        if p.is_file():
-            raw_files[p.name] = p
-
-    # lista file sorgente
-    src_files = [p for p in run_dir.iterdir() if p.is_file()]
+    # indicizziamo RAW_ALL (DirEntry: dimensione senza un secondo stat)
+    raw_files: Dict[str, os.DirEntry] = {e.name: e for e in scan_files(raw_all_dir)}
+
+    # file sorgente: un solo passaggio calcola nome e categoria, riusati da tutte
+    # le validazioni (niente Path intermedi, niente classify ripetuti)
+    src_items: List[Tuple[str, os.DirEntry, str]] = [
+        (e.name, e, classify_category(e.name)) for e in scan_files(run_dir)
+    ]
+
+    # validazioni 1 e 2 in un solo passaggio sui file sorgente:
+    #   1) ogni src deve essere in RAW_ALL (stessa dimensione, opzionale hash)
+    #      -> errors
+    #   2) i file categorizzati devono essere anche nella cartella categoria
+    #      -> warnings
+    # ognuna scrive nella sua lista, quindi l'ordine dei messaggi non cambia.
+    # Mancanti in blocco con una differenza di insiemi (riusata anche dalla 4 per
+    # gli extra); per le categorie un solo scandir per cartella, poi membership
+    # test sul set dei nomi.
+    src_names = {name for name, _src, _cat in src_items}
+    missing = src_names - raw_files.keys()
+    cat_names: Dict[str, Optional[Set[str]]] = {}
+    for name, src, cat in src_items:
+        if cat and cat != "RAW_ALL":
+            if cat not in cat_names:
+                cat_names[cat] = list_file_names(os.path.join(run_base, cat))
+            present = cat_names[cat]
+            if present is None:
+                warnings.append(
+                    f"Cartella categoria {cat} mancante (dovrebbe esistere)."
+                )
+            elif name not in present:
+                warnings.append(
+                    f"File categorizzato atteso in {cat}: {name} non trovato."
+                )
 
-    # validazione 1: tutti i src devono essere in RAW_ALL
-    for src in src_files:
-        name = src.name
-        if name not in raw_files:
+        if name in missing:
             errors.append(f"File sorgente NON trovato in RAW_ALL: {name}")
             continue
 
@@ -294,11 +461,13 @@ def validate_run(
 
         # confronta dimensioni
         try:
-            src_size = src.stat().st_size
-            dst_size = dst.stat().st_size
+            src_st = src.stat()
+            dst_st = dst.stat()
         except OSError as e:
             errors.append(f"Errore leggendo dimensioni per {name}: {e}")
             continue
+        src_size = src_st.st_size
+        dst_size = dst_st.st_size
 
         if src_size != dst_size:
             errors.append(
@@ -308,38 +477,40 @@ def validate_run(
 
         # opzionale hash
         if use_hash:
-            src_hash = sha256_file(src)
-            dst_hash = sha256_file(dst)
+            # hardlink/move: src e dst sono lo stesso file, hash inutile
+            if same_file(src, src_st, dst, dst_st):
+                continue
+            # dst sul pool (se c'è) in parallelo al src, calcolato in questo thread
+            if hash_pool is not None:
+                dst_future = hash_pool.submit(sha256_file, dst)
+                src_hash = sha256_file(src)
+                dst_hash = dst_future.result()
+            else:
+                src_hash = sha256_file(src)
+                dst_hash = sha256_file(dst)
             if src_hash != dst_hash:
                 errors.append(
                     f"Mismatch SHA256 per {name}: src={src_hash}, dst={dst_hash}"
                 )
 
-    # validazione 2: categoria per file noti
-    for src in src_files:
-        cat = classify_category(src.name)
-        if not cat or cat == "RAW_ALL":
-            continue
-        cat_dir = run_base / cat
-        cat_file = cat_dir / src.name
-        if not cat_dir.exists():
-            warnings.append(f"Cartella categoria {cat} mancante (dovrebbe esistere).")
-            continue
-        if not cat_file.exists():
-            warnings.append(
-                f"File categorizzato atteso in {cat}: {src.name} non trovato."
-            )
-
     # validazione 3: META/acquisition_meta.json (se c'è)
-    meta_path = run_base / "META" / "acquisition_meta.json"
-    if meta_path.exists():
+    meta_path = os.path.join(run_base, "META", "acquisition_meta.json")
+    # un solo open: niente exists() + read (stat + open)
+    try:
+        with open(meta_path, "rb") as f:
+            raw_meta = f.read()
+    except FileNotFoundError:
+        warnings.append("META/acquisition_meta.json non trovato.")
+    except OSError as e:
+        warnings.append(f"Errore leggendo/parsing acquisition_meta.json: {e}")
+    else:
         try:
-            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            meta = loads_json(raw_meta)
             meta_total = int(meta.get("total_files", -1))
-            if meta_total != len(src_files):
+            if meta_total != len(src_items):
                 warnings.append(
                     f"acquisition_meta.json total_files={meta_total}, "
-                    f"ma sorgenti={len(src_files)}"
+                    f"ma sorgenti={len(src_items)}"
                 )
 
             # check consistenza serial nei meta, se presente
@@ -353,16 +524,16 @@ def validate_run(
 
         except Exception as e:
             warnings.append(f"Errore leggendo/parsing acquisition_meta.json: {e}")
-    else:
-        warnings.append("META/acquisition_meta.json non trovato.")
 
     # validazione 4: file extra in RAW_ALL (non presenti nell'originale)
-    src_names = {p.name for p in src_files}
-    extra_raw = [name for name in raw_files.keys() if name not in src_names]
+    extra_raw = sorted(raw_files.keys() - src_names)
     if extra_raw:
+        # 100 nomi (>= 1 char + ", ") coprono sempre i 200 caratteri mostrati:
+        # inutile unire l'intera lista solo per troncarla
+        shown = ", ".join(islice(extra_raw, 100))[:200]
         warnings.append(
             f"{len(extra_raw)} file extra in RAW_ALL non presenti nella run sorgente: "
-            f"{', '.join(sorted(extra_raw))[:200]}..."
+            f"{shown}..."
         )
 
     return {"info": info, "errors": errors, "warnings": warnings}
@@ -404,6 +575,12 @@ def main():
         action="store_true",
         help="Confronta anche SHA256 dei file (più lento ma più forte).",
     )
+    ap.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f"Run validate in parallelo (default: {DEFAULT_WORKERS}; 1 = sequenziale).",
+    )
     args = ap.parse_args()
 
     android_root = Path(args.android_logs_root).resolve()
@@ -432,39 +609,58 @@ def main():
     total_runs = 0
     ok_runs = 0
 
-    for run_dir in run_dirs:
-        total_runs += 1
-        result = validate_run(
-            run_dir=run_dir,
-            dataset_root=dataset_root,
-            script_name=args.script_name,
-            script_version=args.script_version,
-            use_hash=args.hash,
-        )
-        info = result["info"]
-        errors = result["errors"]
-        warnings = result["warnings"]
-
-        print(f"=== RUN: {info['run_dir']} ===")
-        print(f"    serial         = {info['serial']}")
-        print(f"    run_id         = {info['run_id']}")
-        print(f"    run_base       = {info['run_base']}")
-        print(f"    device_logical = {info['device_logical']}")
-
-        if errors:
-            any_error = True
-            print("  [ERRORS]")
-            for e in errors:
-                print(f"    - {e}")
-        if warnings:
-            print("  [WARNINGS]")
-            for w in warnings:
-                print(f"    - {w}")
-
-        if not errors:
-            ok_runs += 1
-            print("  [OK] Nessun errore critico per questa run.")
-        print("")
+    # indice run_id -> cartelle target costruito una volta sola prima del loop
+    run_index = index_runs(
+        str(dataset_root), f"{args.script_name}_{args.script_version}"
+    )
+
+    # hash del file di destinazione in parallelo a quello sorgente (dischi spesso
+    # diversi): pool creato solo con --hash, della stessa dimensione del pool delle
+    # run così non diventa il collo di bottiglia, e chiuso all'uscita dal with
+    hash_ctx = (
+        ThreadPoolExecutor(max_workers=max(1, args.workers)) if args.hash else nullcontext()
+    )
+    with hash_ctx as hash_pool:
+        def validate(run_dir: Path) -> Dict[str, object]:
+            return validate_run(
+                run_dir=run_dir,
+                dataset_root=dataset_root,
+                run_index=run_index,
+                use_hash=args.hash,
+                hash_pool=hash_pool,
+            )
+
+        # ex.map restituisce i risultati nell'ordine delle run man mano che sono pronti:
+        # l'output resta identico al loop sequenziale, stampato solo dal thread principale
+        with ThreadPoolExecutor(max_workers=max(1, args.workers)) as ex:
+            for result in ex.map(validate, run_dirs):
+                total_runs += 1
+                info = result["info"]
+                errors = result["errors"]
+                warnings = result["warnings"]
+
+                # blocco della run costruito in memoria e scritto con una sola write
+                lines = [
+                    f"=== RUN: {info['run_dir']} ===\n",
+                    f"    serial         = {info['serial']}\n",
+                    f"    run_id         = {info['run_id']}\n",
+                    f"    run_base       = {info['run_base']}\n",
+                    f"    device_logical = {info['device_logical']}\n",
+                ]
+
+                if errors:
+                    any_error = True
+                    lines.append("  [ERRORS]\n")
+                    lines.extend(f"    - {e}\n" for e in errors)
+                if warnings:
+                    lines.append("  [WARNINGS]\n")
+                    lines.extend(f"    - {w}\n" for w in warnings)
+
+                if not errors:
+                    ok_runs += 1
+                    lines.append("  [OK] Nessun errore critico per questa run.\n")
+                lines.append("\n")
+                sys.stdout.write("".join(lines))
 
     print("===== SUMMARY =====")
     print(f"Total runs      : {total_runs}")